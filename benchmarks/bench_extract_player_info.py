@@ -0,0 +1,67 @@
+"""
+Benchmarks extract_player_info against the previous implementation on fixture pages rendered from
+data/match_example.json, and checks that both produce byte-identical output.
+
+Usage: python benchmarks/bench_extract_player_info.py [--repeat N]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import legacy
+from fixtures import load_example, missing_stats_match, render_match_page
+from vlr_scraper.match_details import extract_player_info
+
+def fixture_pages() -> dict[str, str]:
+    """
+    The example match, and a copy of it with some stat columns and sides missing.
+    """
+    match = load_example()
+    return {
+        'match_example': render_match_page(match),
+        'missing_stats': render_match_page(missing_stats_match(match))
+    }
+
+def player_tables(html: str) -> list[BeautifulSoup]:
+    soup = BeautifulSoup(html, 'html.parser')
+    return [table for table in soup.find_all('table', class_='wf-table-inset') if table.find('tr')]
+
+def best_time(function, tables: list[BeautifulSoup], repeat: int) -> float:
+    """
+    Best wall time out of `repeat` runs of the function over all tables.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for table in tables:
+            function(table)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark extract_player_info against the previous implementation')
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per implementation, the best one is reported (default: 20)')
+    args = parser.parse_args()
+
+    for name, html in fixture_pages().items():
+        tables = player_tables(html)
+
+        old_output = json.dumps([legacy.extract_player_info(table) for table in tables])
+        new_output = json.dumps([extract_player_info(table) for table in tables])
+        if old_output != new_output:
+            sys.exit(f'{name}: output differs from the previous implementation')
+
+        old_time = best_time(legacy.extract_player_info, tables, args.repeat)
+        new_time = best_time(extract_player_info, tables, args.repeat)
+        print(
+            f'{name}: {len(tables)} tables, output identical | '
+            f'old {old_time * 1000:.2f} ms, new {new_time * 1000:.2f} ms, {old_time / new_time:.1f}x faster'
+        )
+
+if __name__ == '__main__':
+    main()
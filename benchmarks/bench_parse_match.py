@@ -0,0 +1,75 @@
+"""
+Benchmarks the match extractor against the previous implementation, which scraped every game div twice and looked up
+each header field with its own whole-document search, on the fixture corpus (plus any pages recorded in benchmarks/pages)
+with every parser backend, and checks that both produce byte-identical output.
+extract_match is timed on trees parsed up front, parse_match includes building the tree, which the change doesn't touch.
+
+Usage: python benchmarks/bench_parse_match.py [--repeat N]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+from typing import Callable
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import legacy
+from fixtures import match_corpus, recorded_pages, render_match_page
+from vlr_scraper.match_details import extract_match, parse_match
+from vlr_scraper.parsers import PARSER_BACKENDS, make_soup
+
+def fixture_pages() -> dict[str, tuple[bytes, str]]:
+    """
+    (content, url) of every match page in the corpus by name.
+    """
+    pages = {name: (render_match_page(match).encode('utf-8'), match['url']) for name, match in match_corpus().items()}
+    for name, content in recorded_pages('match').items():
+        pages[name] = (content, f'https://www.vlr.gg/0/{name}')
+    return pages
+
+def best_time(function: Callable, calls: list[tuple], repeat: int) -> float:
+    """
+    Best wall time out of `repeat` runs of the function over all argument tuples.
+    The garbage collector is off while timing like in timeit, its passes over the parsed trees are noisy.
+    """
+    times = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for args in calls:
+                function(*args)
+            times.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return min(times)
+
+def report(name: str, old_time: float, new_time: float) -> None:
+    print(f'  {name}: old {old_time * 1000:.2f} ms, new {new_time * 1000:.2f} ms, {old_time / new_time:.2f}x faster')
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark parse_match against the previous implementation')
+    parser.add_argument('--repeat', type=int, default=10, help='Runs per implementation, the best one is reported (default: 10)')
+    args = parser.parse_args()
+
+    pages = fixture_pages()
+    for backend in PARSER_BACKENDS:
+        for name, (content, url) in pages.items():
+            if json.dumps(legacy.parse_match(content, url, backend)) != json.dumps(parse_match(content, url, backend)):
+                sys.exit(f'{name}: {backend} output differs from the previous implementation')
+
+        print(f'{backend}: {len(pages)} pages, output identical')
+        soups = [(make_soup(content, backend), url) for content, url in pages.values()]
+        report('extract_match', best_time(legacy.extract_match, soups, args.repeat), best_time(extract_match, soups, args.repeat))
+        # The trees are freed first, so they don't slow down the parse_match runs
+        del soups
+
+        raw = [(content, url, backend) for content, url in pages.values()]
+        report('parse_match', best_time(legacy.parse_match, raw, args.repeat), best_time(parse_match, raw, args.repeat))
+
+if __name__ == '__main__':
+    main()
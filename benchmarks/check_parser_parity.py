@@ -0,0 +1,66 @@
+"""
+Parses the fixture pages with every parser backend and checks that the outputs are identical
+to the html.parser output, and times each backend.
+
+Usage: python benchmarks/check_parser_parity.py [--repeat N]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Callable
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fixtures import load_example, missing_stats_match, render_match_page, render_results_page, with_inline_scripts
+from vlr_scraper.match_details import parse_match
+from vlr_scraper.match_urls import parse_last_page, parse_results_page
+from vlr_scraper.parsers import PARSER_BACKENDS
+
+def fixture_pages() -> list[tuple[str, str, Callable]]:
+    """
+    (name, html, function that parses it) for each fixture page.
+    """
+    match = load_example()
+    results = render_results_page([f'/{100000 + i}/team-a-vs-team-b-event-{i}' for i in range(50)], page=3, last_page=596)
+    return [
+        ('match_example', render_match_page(match), lambda content, backend: parse_match(content, match['url'], backend)),
+        ('missing_stats', render_match_page(missing_stats_match(match)), lambda content, backend: parse_match(content, match['url'], backend)),
+        ('inline_scripts', with_inline_scripts(render_match_page(match)), lambda content, backend: parse_match(content, match['url'], backend)),
+        ('results_page', results, parse_results_page),
+        ('results_inline_scripts', with_inline_scripts(results), parse_results_page),
+        ('results_last_page', results, parse_last_page)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that every parser backend gives the same output')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per backend, the best one is reported (default: 5)')
+    args = parser.parse_args()
+
+    failed = False
+    for name, html, parse in fixture_pages():
+        content = html.encode('utf-8')
+        expected = json.dumps(parse(content, 'html.parser'))
+
+        timings = []
+        for backend in PARSER_BACKENDS:
+            if json.dumps(parse(content, backend)) != expected:
+                print(f'{name}: {backend} output differs from html.parser')
+                failed = True
+                continue
+
+            times = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                parse(content, backend)
+                times.append(time.perf_counter() - start)
+            timings.append(f'{backend} {min(times) * 1000:.2f} ms')
+
+        print(f'{name}: {", ".join(timings)}')
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
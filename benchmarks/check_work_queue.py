@@ -0,0 +1,138 @@
+"""
+Checks the distributed mode locally: the WorkQueue's claims, lease expiry, re-queueing and failed jobs, then a run of
+worker processes against the stub server where one worker is killed mid-batch. Its lease has to expire and its matches
+have to be scraped by the others, pages that keep failing have to end up failed, and merge_shards has to keep exactly
+one record per match ID.
+
+Usage: python benchmarks/check_work_queue.py [--matches 120] [--workers 2]
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fixtures import match_corpus, render_match_page
+from stub_server import StubServer
+from vlr_scraper.distributed import merge_shards, shard_paths
+from vlr_scraper.match_index import match_id
+from vlr_scraper.work_queue import WorkQueue
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def check(condition: bool, message: str) -> None:
+    if not condition:
+        sys.exit(f'FAILED: {message}')
+
+def check_queue(directory: str) -> None:
+    """
+    Claims, leases and attempts on a queue of its own, without any scraping.
+    """
+    urls = [f'https://www.vlr.gg/{id_}/match' for id_ in range(1, 11)]
+    queue = WorkQueue(os.path.join(directory, 'queue.db'), lease_seconds=0.5, max_attempts=2)
+    check(queue.add(urls) == 10 and queue.add(urls) == 0, 'adding the same matches again queues nothing')
+
+    first = queue.claim('a', 4)
+    check([id_ for id_, _ in first] == [1, 2, 3, 4], f'claims the lowest match IDs first, got {first}')
+    check([id_ for id_, _ in queue.claim('b', 4)] == [5, 6, 7, 8], 'a second worker gets other matches')
+    check(queue.counts() == {'pending': 2, 'leased': 8, 'done': 0, 'failed': 0}, f'counts after claiming: {queue.counts()}')
+
+    check(queue.complete('a', [1, 2]) == 2, "the lease holder completes its matches")
+    check(queue.complete('b', [3]) == 0, "a worker can't complete another worker's matches")
+    check(queue.release('a', [3]) == 1, 'released matches go back to the queue')
+
+    # 'a' keeps its lease on 4 by renewing it, the lease of 'b' runs out
+    time.sleep(0.3)
+    queue.renew('a', [4])
+    time.sleep(0.3)
+    again = queue.claim('c', 10)
+    check(sorted(id_ for id_, _ in again) == [3, 5, 6, 7, 8, 9, 10], f'expired leases are re-queued, got {again}')
+    check(queue.complete('b', [5]) == 0, "a worker whose lease expired can't complete the matches")
+
+    # Second attempt for 3 and 5-8: failing again sets them aside
+    check(queue.release('c', [3, 5, 6, 7, 8, 9, 10]) == 7, 'releasing the claimed matches')
+    counts = queue.counts()
+    check(counts == {'pending': 2, 'leased': 1, 'done': 2, 'failed': 5}, f'matches out of attempts are failed: {counts}')
+    check(queue.retry_failed() == 5 and queue.counts()['failed'] == 0, 'retry_failed queues the failed matches again')
+    queue.close()
+
+def worker_command(queue_path: str, shard_dir: str, worker: str, lease_seconds: float) -> list[str]:
+    return [
+        sys.executable, '-m', 'vlr_scraper.distributed', '--queue', queue_path, '--shard-dir', shard_dir, 'work',
+        '--worker-id', worker, '--batch-size', '20', '--lease-seconds', str(lease_seconds), '--max-attempts', '2',
+        '--poll-interval', '0.5', '--workers', '2', '--rate', '50', '--burst', '2', '--parse-workers', '1',
+        '--report-interval', '3600', '--flush-every', '1', '--no-cache'
+    ]
+
+def check_workers(directory: str, matches: int, workers: int) -> None:
+    corpus = [render_match_page(match).encode('utf-8') for match in match_corpus().values()]
+    pages = {f'/{100000 + i}/match': corpus[i % len(corpus)] for i in range(matches)}
+    missing = [f'/{900000 + i}/match' for i in range(3)]
+    queue_path = os.path.join(directory, 'work_queue.db')
+    shard_dir = os.path.join(directory, 'shards')
+    # No proxy from .env for the local stub server, and the package from this checkout
+    env = dict(os.environ, HTTP='', HTTPS='', PYTHONPATH=ROOT)
+
+    with StubServer(pages.get, latency=0.1) as stub:
+        queue = WorkQueue(queue_path)
+        queue.add([stub.url + path for path in list(pages) + missing])
+
+        # The first worker is killed with its parser and writer processes once it has written part of a batch
+        victim = subprocess.Popen(worker_command(queue_path, shard_dir, 'victim', 2), cwd=directory, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+        victim_data, _ = shard_paths(shard_dir, 'victim')
+        deadline = time.monotonic() + 60
+        while not (os.path.exists(victim_data) and os.path.getsize(victim_data) > 0):
+            check(time.monotonic() < deadline and victim.poll() is None, 'the first worker started writing its shard')
+            time.sleep(0.05)
+        os.killpg(victim.pid, signal.SIGKILL)
+        victim.wait()
+        leased = dict((worker, count) for worker, count, _ in queue.workers())
+        check(leased.get('victim', 0) > 0, 'the killed worker still holds leases')
+        print(f'Killed a worker holding {leased["victim"]} leases')
+
+        start = time.monotonic()
+        processes = [
+            subprocess.Popen(worker_command(queue_path, shard_dir, f'worker-{i}', 30), cwd=directory, env=env,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            for i in range(workers)
+        ]
+        for process in processes:
+            check(process.wait(timeout=600) == 0, 'the workers exit cleanly')
+        print(f'{workers} workers emptied the queue in {time.monotonic() - start:.1f}s')
+
+    counts = queue.counts()
+    check(counts == {'pending': 0, 'leased': 0, 'done': matches, 'failed': len(missing)}, f'every match is done or failed: {counts}')
+    retried = queue.db.execute("SELECT COUNT(*) FROM jobs WHERE state = 'done' AND attempts > 1").fetchone()[0]
+    check(retried > 0, "the killed worker's matches were scraped on a later attempt")
+    queue.close()
+
+    data_path = os.path.join(directory, 'scraped_data.json')
+    log_path = os.path.join(directory, 'scraped_urls.log')
+    added, duplicates = merge_shards(shard_dir, data_path, log_path)
+    with open(data_path, 'r') as f:
+        ids = [match_id(json.loads(line)['url']) for line in f]
+    check(added == matches and len(ids) == matches, f'merge wrote {added} records for {matches} matches')
+    check(sorted(ids) == sorted(100000 + i for i in range(matches)), 'merge keeps exactly one record per match ID')
+    check(merge_shards(shard_dir, data_path, log_path)[0] == 0, 'merging again adds nothing')
+    print(f'Merged {added} matches, skipped {duplicates} duplicates, {retried} matches were retried after the lease expired')
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the work queue and the distributed workers against the stub server')
+    parser.add_argument('--matches', type=int, default=120, help='Match pages to scrape (default: 120)')
+    parser.add_argument('--workers', type=int, default=2, help='Worker processes after the killed one (default: 2)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        check_queue(directory)
+        print('Queue: claims, leases, expiry, attempts and retries OK')
+        check_workers(directory, args.matches, args.workers)
+    print('OK')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+"""
+Renders vlr.gg-style match pages from parsed match dicts (like data/match_example.json),
+so the parser can be benchmarked and checked offline. Pages recorded from vlr.gg with record_fixtures.py
+are saved in benchmarks/pages and added to the corpus.
+"""
+import copy
+import glob
+import json
+import os
+import re
+from html import escape
+from typing import Optional
+
+EXAMPLE_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'match_example.json')
+PAGES_DIR = os.path.join(os.path.dirname(__file__), 'pages')
+
+STAT_COLUMNS = [
+    ('r_stats', 'mod-stat'),
+    ('acs_stats', 'mod-stat'),
+    ('kill_stats', 'mod-stat mod-vlr-kills'),
+    ('death_stats', 'mod-stat mod-vlr-deaths'),
+    ('assist_stats', 'mod-stat mod-vlr-assists'),
+    ('kd_diff_stats', 'mod-stat mod-kd-diff'),
+    ('kast_stats', 'mod-stat'),
+    ('adr_stats', 'mod-stat mod-combat'),
+    ('headshot_stats', 'mod-stat'),
+    ('fk_stats', 'mod-stat mod-fb'),
+    ('fd_stats', 'mod-stat mod-fd'),
+    ('fk_diff_stats', 'mod-stat mod-fk-diff'),
+]
+
+def _stats_cell(cls: str, stats: Optional[dict]) -> str:
+    if stats is None:
+        return f'<td class="{cls}"></td>'
+    spans = ''.join(
+        f'<span class="side mod-side mod-{side}">{escape(stats[side])}</span>'
+        for side in ('both', 't', 'ct') if stats.get(side) is not None
+    )
+    return f'<td class="{cls}">\n\t<span class="stats-sq">{spans}</span>\n</td>'
+
+def render_player_row(player: dict) -> str:
+    cells = [
+        '<td class="mod-player"><div style="display: flex; align-items: center">'
+        f'<div class="text-of" style="font-weight: 700;">\n\t\t{escape(player.get("name") or "")}\n\t</div>'
+        f'<div class="ge-text-light">{escape(player.get("team_code") or "")}</div>'
+        f'<i class="flag mod-xx" title="{escape(player.get("country") or "")}"></i></div></td>',
+        f'<td class="mod-agents"><div><span class="stats-sq mod-agent small"><img src="/img/vlr/game/agents/x.png" title="{escape(player.get("agent") or "")}"></span></div></td>',
+    ]
+    cells += [_stats_cell(cls, player.get(key)) for key, cls in STAT_COLUMNS]
+    return '<tr>\n' + '\n'.join(cells) + '\n</tr>'
+
+def render_player_table(players: Optional[list[dict]]) -> str:
+    rows = '\n'.join(render_player_row(player) for player in players or [])
+    return (
+        '<table class="wf-table-inset mod-overview">\n<thead><tr><th></th><th></th><th title="Rating">R</th><th>ACS</th></tr></thead>\n'
+        f'<tbody>\n{rows}\n</tbody>\n</table>'
+    )
+
+def _team_div(overview: dict, right: bool) -> str:
+    score = f'<div class="score">{escape(overview.get("score") or "")}</div>'
+    name = f'<div class="team-name">\n\t\t{escape(overview.get("name") or "")}\n\t</div>'
+    sides = (
+        f'<span class="mod-t">{escape(overview.get("t_side_score") or "")}</span> / '
+        f'<span class="mod-ct">{escape(overview.get("ct_side_score") or "")}</span>'
+    )
+    inner = f'<div>{name}<div>{sides}</div></div>{score}' if right else f'{score}<div>{name}<div>{sides}</div></div>'
+    return f'<div class="team{" mod-right" if right else ""}">{inner}</div>'
+
+def render_game(game: dict, game_id: int) -> str:
+    tables = ''
+    if game['team_left']['players'] is not None:
+        tables = (
+            f'<div>{render_player_table(game["team_left"]["players"])}</div>\n'
+            f'<div>{render_player_table(game["team_right"]["players"])}</div>'
+        )
+    return (
+        f'<div class="vm-stats-game" data-game-id="{game_id}">\n'
+        '<div class="vm-stats-game-header">\n'
+        f'{_team_div(game["team_left"]["team_overview"], False)}\n'
+        f'<div class="map"><div style="font-weight: 700;"><span style="position: relative;">{escape(game["map"]["name"] or "")}</span></div>'
+        f'<div class="map-duration ge-text-light">{escape(game["map"]["duration"] or "")}</div></div>\n'
+        f'{_team_div(game["team_right"]["team_overview"], True)}\n'
+        '</div>\n'
+        f'{tables}\n'
+        '</div>'
+    )
+
+def render_match_page(match: dict) -> str:
+    date_time = f'{match["date"]} {match["time"]}' if match.get('date') else None
+    date_div = f'<div class="moment-tz-convert" data-utc-ts="{date_time}">Saturday, June 18th</div>' if date_time else ''
+    if match.get('team_1_score'):
+        scoreline = (
+            '<div class="js-spoiler"><span class="match-header-vs-score-winner">'
+            f'{escape(match["team_1_score"])}</span><span class="match-header-vs-score-colon">:</span>'
+            f'<span class="match-header-vs-score-loser">{escape(match["team_2_score"])}</span></div>'
+        )
+    else:
+        scoreline = '<div class="match-header-vs-score-colon">vs.</div>'
+    stage = f'<div class="match-header-vs-note">{escape(match["stage"])}</div>' if match.get('stage') is not None else ''
+    match_type = f'<div class="match-header-vs-note">{escape(match["match_type"])}</div>' if match.get('match_type') is not None else ''
+    # The first vm-stats-game is the "All maps" overview, it has no header and is skipped by the parser
+    games = '\n'.join(render_game(game, i + 1) for i, game in enumerate(match['games']))
+    return f'''<!DOCTYPE html>
+<html>
+<head><title>{escape(match["team_1"] or "")} vs. {escape(match["team_2"] or "")} | VLR.gg</title></head>
+<body>
+<div class="col mod-3">
+<div class="wf-card match-header">
+<div class="match-header-super">
+<div><a class="match-header-event" href="/event/1/x">
+<div>
+<div style="font-weight: 700;">{escape(match["event"])}</div>
+<div class="match-header-event-series">\n\t\t\t{escape(match["event_series"])}\n\t\t</div>
+</div>
+</a></div>
+<div class="match-header-date">{date_div}</div>
+</div>
+<div class="match-header-vs">
+<a class="match-header-link mod-1"><div class="match-header-link-name mod-1"><div class="wf-title-med">\n\t\t{escape(match["team_1"] or "")}\n\t</div></div></a>
+<div class="match-header-vs-score">{stage}
+<div class="match-header-vs-score">{scoreline}</div>
+{match_type}</div>
+<a class="match-header-link mod-2"><div class="match-header-link-name mod-2"><div class="wf-title-med">\n\t\t{escape(match["team_2"] or "")}\n\t</div></div></a>
+</div>
+</div>
+<div class="vm-stats">
+<div class="vm-stats-container">
+<div class="vm-stats-game mod-active" data-game-id="all"><div><table class="wf-table-inset mod-overview"><tbody></tbody></table></div></div>
+{games}
+</div>
+</div>
+</div>
+</body>
+</html>
+'''
+
+def render_results_page(match_paths: list[str], page: int, last_page: int, per_day: int = 10) -> str:
+    """
+    Renders a /matches/results page: one wf-card of match links per day and the pagination links.
+    """
+    cards = []
+    for i in range(0, len(match_paths), per_day):
+        items = '\n'.join(
+            f'<a href="{escape(path)}" class="wf-module-item match-item mod-color mod-left mod-bg-after-striped_purple">'
+            '<div class="match-item-time">\n\t\t5:00 PM\n\t</div><div class="match-item-vs">...</div></a>'
+            for path in match_paths[i:i + per_day]
+        )
+        cards.append(f'<div class="wf-label mod-large">Sat, June 18, 2022</div>\n<div class="wf-card" style="margin-bottom: 30px;">\n{items}\n</div>')
+
+    links = [f'<span class="btn mod-page mod-active">{page}</span>']
+    links += [f'<a href="/matches/results/?page={n}" class="btn mod-page">{n}</a>' for n in sorted({1, 2, page + 1, last_page}) if n != page and n <= last_page]
+    if page < last_page:
+        links.append(f'<a href="/matches/results/?page={page + 1}" class="btn mod-page mod-next">&raquo;</a>')
+
+    return f'''<!DOCTYPE html>
+<html>
+<head><title>Valorant Match Results | VLR.gg</title></head>
+<body>
+<div class="col mod-1">
+{chr(10).join(cards)}
+<div class="action-container">
+<div class="action-container-pages">
+{chr(10).join(links)}
+</div>
+</div>
+</div>
+</body>
+</html>
+'''
+
+def load_example(path: str = EXAMPLE_PATH) -> dict:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def missing_stats_match(match: dict) -> dict:
+    """
+    Copy of the match with some stat columns and sides missing, like pages with partial stats.
+    """
+    match = copy.deepcopy(match)
+    for game in match['games']:
+        for player in game['team_left']['players']:
+            player['fk_stats'] = None
+            player['kast_stats']['t'] = None
+        for player in game['team_right']['players'][::2]:
+            player['kill_stats'] = None
+            player['headshot_stats']['both'] = None
+    return match
+
+INLINE_NOISE = '<script>var noise = "script text";</script><!-- comment text --><style>.noise { color: red; }</style>'
+
+def with_inline_scripts(html: str) -> str:
+    """
+    The page with a script, a comment and a style at the start of every div, span and link, like the inline
+    ad and tracking snippets of real pages. None of their text is part of the elements' text.
+    """
+    return re.sub(r'(<(?:div|span|a)\b[^>]*>)', lambda tag: tag.group(1) + INLINE_NOISE, html)
+
+def _with_games(match: dict, games: list[dict], match_type: str, score: tuple[str, str]) -> dict:
+    match = copy.deepcopy(match)
+    match['games'] = copy.deepcopy(games)
+    match['match_type'] = match_type
+    match['team_1_score'], match['team_2_score'] = score
+    return match
+
+def bo1_match(match: dict) -> dict:
+    return _with_games(match, match['games'][:1], 'Bo1', ('1', '0'))
+
+def bo5_match(match: dict) -> dict:
+    """
+    Five maps, cycling through the example's maps under other map names.
+    """
+    games = []
+    for i, map_name in enumerate(['Haven', 'Bind', 'Ascent', 'Split', 'Icebox']):
+        game = copy.deepcopy(match['games'][i % len(match['games'])])
+        game['map']['name'] = map_name
+        games.append(game)
+    return _with_games(match, games, 'Bo5', ('3', '2'))
+
+def forfeit_match(match: dict) -> dict:
+    """
+    A forfeited match: a 1:0 result without any maps played.
+    """
+    return _with_games(match, [], 'Bo3', ('1', '0'))
+
+def no_stats_match(match: dict) -> dict:
+    """
+    Maps with scores but without the player stats tables, like matches whose stats were never published.
+    """
+    match = copy.deepcopy(match)
+    for game in match['games']:
+        game['team_left']['players'] = None
+        game['team_right']['players'] = None
+    return match
+
+def match_corpus(match: Optional[dict] = None) -> dict[str, dict]:
+    """
+    Match dicts covering the page layouts the parser has to handle, by name.
+    All of them except missing_stats round-trip: parse_match(render_match_page(match)) == match
+    (the parser leaves missing stat columns out of the player dict instead of setting them to None).
+    """
+    match = match or load_example()
+    return {
+        'bo1': bo1_match(match),
+        'bo3': match,
+        'bo5': bo5_match(match),
+        'forfeit': forfeit_match(match),
+        'missing_stats': missing_stats_match(match),
+        'no_stats': no_stats_match(match)
+    }
+
+def results_corpus() -> dict[str, str]:
+    """
+    Results pages by name: a full page from the middle of the listing and the shorter last page.
+    """
+    return {
+        'results': render_results_page([f'/{100000 + i}/team-a-vs-team-b-event-{i}' for i in range(50)], page=3, last_page=596),
+        'results_last_page': render_results_page([f'/{1000 + i}/team-a-vs-team-b-event-{i}' for i in range(12)], page=596, last_page=596)
+    }
+
+def recorded_pages(kind: str) -> dict[str, bytes]:
+    """
+    Pages recorded from vlr.gg by record_fixtures.py, `kind` is 'match' or 'results'.
+    """
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(PAGES_DIR, f'{kind}-*.html'))):
+        with open(path, 'rb') as f:
+            pages[os.path.basename(path)[:-len('.html')]] = f.read()
+    return pages
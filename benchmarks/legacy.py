@@ -0,0 +1,244 @@
+"""
+The parser code as it was before it was optimized, kept as the baseline for benchmarks and output comparisons.
+"""
+from bs4 import BeautifulSoup
+from vlr_scraper.match_details import scrape_game
+from vlr_scraper.parsers import make_soup
+
+def extract_player_info(table: BeautifulSoup) -> list[dict]:
+    """
+    Extracts each player's stats from the players table.
+    It is called for each player table (two per game, one for each team).
+    """
+
+    player_info = []
+
+    tbody = table.find('tbody')
+    rows = tbody.find_all('tr') if tbody else []
+
+    # Iterate over each row
+    for row in rows:
+        # Extract player data
+        player_data = {}
+
+        player_details_row = row.find('td', class_='mod-player')
+        if player_details_row:
+
+            name_div = player_details_row.find('div', class_='text-of')
+            player_data['name'] = name_div.text.strip() if name_div else None
+
+            team_code_div = player_details_row.find('div', class_='ge-text-light')
+            player_data['team_code'] = team_code_div.text.strip() if team_code_div else None
+
+            country_div = player_details_row.find('i', class_='flag')
+            player_data['country'] = country_div.get('title') if country_div else None
+
+        agent_row = row.find('td', class_='mod-agents')
+        # Extract the agent's name
+        if agent_row:
+            agent_img = agent_row.find('img')
+            player_data['agent'] = agent_img.get('title') if agent_img else None
+
+        r_stats_row = row.find_all('td')[2]  # Assuming R stats is always the third td - some tds have the same class
+        if r_stats_row:
+            r_stats_div = r_stats_row.find('span', class_='stats-sq')
+            if r_stats_div:
+                r_stats = {
+                    'both': r_stats_div.find('span', class_='mod-both').text.strip() if r_stats_div.find('span', class_='mod-both') else None,
+                    't': r_stats_div.find('span', class_='mod-t').text.strip() if r_stats_div.find('span', class_='mod-t') else None,
+                    'ct': r_stats_div.find('span', class_='mod-ct').text.strip() if r_stats_div.find('span', class_='mod-ct') else None
+                }
+                player_data['r_stats'] = r_stats
+
+        acs_stats_row = row.find_all('td')[3]  # Assuming ACS stats is always the fourth td
+        if acs_stats_row:
+            acs_stats_div = acs_stats_row.find('span', class_='stats-sq')
+            if acs_stats_div:
+                acs_stats = {
+                    'both': acs_stats_div.find('span', class_='mod-both').text.strip() if acs_stats_div.find('span', class_='mod-both') else None,
+                    't': acs_stats_div.find('span', class_='mod-t').text.strip() if acs_stats_div.find('span', class_='mod-t') else None,
+                    'ct': acs_stats_div.find('span', class_='mod-ct').text.strip() if acs_stats_div.find('span', class_='mod-ct') else None
+                }
+                player_data['acs_stats'] = acs_stats
+
+        kill_stats_row = row.find('td', class_='mod-vlr-kills')
+        if kill_stats_row:
+            kill_stats_div = kill_stats_row.find('span', class_='stats-sq')
+            if kill_stats_div:
+                kill_stats = {
+                    'both': kill_stats_div.find('span', class_='mod-both').text.strip() if kill_stats_div.find('span', class_='mod-both') else None,
+                    't': kill_stats_div.find('span', class_='mod-t').text.strip() if kill_stats_div.find('span', class_='mod-t') else None,
+                    'ct': kill_stats_div.find('span', class_='mod-ct').text.strip() if kill_stats_div.find('span', class_='mod-ct') else None
+                }
+                player_data['kill_stats'] = kill_stats
+
+        death_stats_row = row.find('td', class_='mod-vlr-deaths')
+        if death_stats_row:
+            death_stats_div = death_stats_row.find('span', class_='stats-sq')
+            if death_stats_div:
+                death_stats = {
+                    'both': death_stats_div.find('span', class_='mod-both').text.strip() if death_stats_div.find('span', class_='mod-both') else None,
+                    't': death_stats_div.find('span', class_='mod-t').text.strip() if death_stats_div.find('span', class_='mod-t') else None,
+                    'ct': death_stats_div.find('span', class_='mod-ct').text.strip() if death_stats_div.find('span', class_='mod-ct') else None
+                }
+                player_data['death_stats'] = death_stats
+
+        assist_stats_row = row.find('td', class_='mod-vlr-assists')
+        if assist_stats_row:
+            assist_stats_div = assist_stats_row.find('span', class_='stats-sq')
+            if assist_stats_div:
+                assist_stats = {
+                    'both': assist_stats_div.find('span', class_='mod-both').text.strip() if assist_stats_div.find('span', class_='mod-both') else None,
+                    't': assist_stats_div.find('span', class_='mod-t').text.strip() if assist_stats_div.find('span', class_='mod-t') else None,
+                    'ct': assist_stats_div.find('span', class_='mod-ct').text.strip() if assist_stats_div.find('span', class_='mod-ct') else None
+                }
+                player_data['assist_stats'] = assist_stats
+
+        kd_diff_stats_row = row.find('td', class_='mod-kd-diff')
+        if kd_diff_stats_row:
+            kd_diff_stats_div = kd_diff_stats_row.find('span', class_='stats-sq')
+            if kd_diff_stats_div:
+                kd_diff_stats = {
+                    'both': kd_diff_stats_div.find('span', class_='mod-both').text.strip() if kd_diff_stats_div.find('span', class_='mod-both') else None,
+                    't': kd_diff_stats_div.find('span', class_='mod-t').text.strip() if kd_diff_stats_div.find('span', class_='mod-t') else None,
+                    'ct': kd_diff_stats_div.find('span', class_='mod-ct').text.strip() if kd_diff_stats_div.find('span', class_='mod-ct') else None
+                }
+                player_data['kd_diff_stats'] = kd_diff_stats
+
+        kast_stats_row = row.find_all('td')[8]  # Assuming KAST stats is always the ninth td
+        if kast_stats_row:
+            kast_stats_div = kast_stats_row.find('span', class_='stats-sq')
+            if kast_stats_div:
+                kast_stats = {
+                    'both': kast_stats_div.find('span', class_='mod-both').text.strip() if kast_stats_div.find('span', class_='mod-both') else None,
+                    't': kast_stats_div.find('span', class_='mod-t').text.strip() if kast_stats_div.find('span', class_='mod-t') else None,
+                    'ct': kast_stats_div.find('span', class_='mod-ct').text.strip() if kast_stats_div.find('span', class_='mod-ct') else None
+                }
+                player_data['kast_stats'] = kast_stats
+
+        adr_stats_row = row.find_all('td')[9]  # Assuming ADR stats is always the tenth td
+        if adr_stats_row:
+            adr_stats_div = adr_stats_row.find('span', class_='stats-sq')
+            if adr_stats_div:
+                adr_stats = {
+                    'both': adr_stats_div.find('span', class_='mod-both').text.strip() if adr_stats_div.find('span', class_='mod-both') else None,
+                    't': adr_stats_div.find('span', class_='mod-t').text.strip() if adr_stats_div.find('span', class_='mod-t') else None,
+                    'ct': adr_stats_div.find('span', class_='mod-ct').text.strip() if adr_stats_div.find('span', class_='mod-ct') else None
+                }
+                player_data['adr_stats'] = adr_stats
+
+        headshot_stats_row = row.find_all('td')[10]  # Assuming headshot stats is always the eleventh td
+        if headshot_stats_row:
+            headshot_stats_div = headshot_stats_row.find('span', class_='stats-sq')
+            if headshot_stats_div:
+                headshot_stats = {
+                    'both': headshot_stats_div.find('span', class_='mod-both').text.strip() if headshot_stats_div.find('span', class_='mod-both') else None,
+                    't': headshot_stats_div.find('span', class_='mod-t').text.strip() if headshot_stats_div.find('span', class_='mod-t') else None,
+                    'ct': headshot_stats_div.find('span', class_='mod-ct').text.strip() if headshot_stats_div.find('span', class_='mod-ct') else None
+                }
+                player_data['headshot_stats'] = headshot_stats
+
+        fk_stats_row = row.find_all('td')[11]  # Assuming FK stats is always the twelfth td
+        if fk_stats_row:
+            fk_stats_div = fk_stats_row.find('span', class_='stats-sq')
+            if fk_stats_div:
+                fk_stats = {
+                    'both': fk_stats_div.find('span', class_='mod-both').text.strip() if fk_stats_div.find('span', class_='mod-both') else None,
+                    't': fk_stats_div.find('span', class_='mod-t').text.strip() if fk_stats_div.find('span', class_='mod-t') else None,
+                    'ct': fk_stats_div.find('span', class_='mod-ct').text.strip() if fk_stats_div.find('span', class_='mod-ct') else None
+                }
+                player_data['fk_stats'] = fk_stats
+
+        fd_stats_row = row.find_all('td')[12]  # Assuming FD stats is always the thirteenth td
+        if fd_stats_row:
+            fd_stats_div = fd_stats_row.find('span', class_='stats-sq')
+            if fd_stats_div:
+                fd_stats = {
+                    'both': fd_stats_div.find('span', class_='mod-both').text.strip() if fd_stats_div.find('span', class_='mod-both') else None,
+                    't': fd_stats_div.find('span', class_='mod-t').text.strip() if fd_stats_div.find('span', class_='mod-t') else None,
+                    'ct': fd_stats_div.find('span', class_='mod-ct').text.strip() if fd_stats_div.find('span', class_='mod-ct') else None
+                }
+                player_data['fd_stats'] = fd_stats
+
+        fk_diff_stats_row = row.find_all('td')[13]  # Assuming FK-Diff stats is always the fourteenth td
+        if fk_diff_stats_row:
+            fk_diff_stats_div = fk_diff_stats_row.find('span', class_='stats-sq')
+            if fk_diff_stats_div:
+                fk_diff_stats = {
+                    'both': fk_diff_stats_div.find('span', class_='mod-both').text.strip() if fk_diff_stats_div.find('span', class_='mod-both') else None,
+                    't': fk_diff_stats_div.find('span', class_='mod-t').text.strip() if fk_diff_stats_div.find('span', class_='mod-t') else None,
+                    'ct': fk_diff_stats_div.find('span', class_='mod-ct').text.strip() if fk_diff_stats_div.find('span', class_='mod-ct') else None
+                }
+                player_data['fk_diff_stats'] = fk_diff_stats
+
+        player_info.append(player_data)
+
+    return player_info
+
+def parse_match(content: bytes, url: str, backend: str = 'html.parser') -> dict:
+    """
+    Parses the match page HTML into the match dict with the chosen parser backend, calls extract_match.
+    """
+    return extract_match(make_soup(content, backend), url)
+
+def extract_match(soup: BeautifulSoup, url: str) -> dict:
+    """
+    Extracts the match dict from the parsed page, calls scrape_game on every game div twice.
+    """
+
+    # Basic data
+    super_div = soup.find('div', class_='match-header-super')
+    event_a = super_div.find('a', class_='match-header-event') if super_div else None
+    inner_div = event_a.find('div') if event_a else None
+    event_divs = inner_div.find_all('div') if inner_div else None
+    event_name = event_divs[0].text.strip().replace('\n', '').replace('\t', '') if event_divs and len(event_divs) > 0 else ''
+    event_series = event_divs[1].text.strip().replace('\n', '').replace('\t', '') if event_divs and len(event_divs) > 1 else ''
+
+    match_header_vs_div = soup.find('div', class_='match-header-vs')
+    team_names = [div.text.strip() for div in match_header_vs_div.find_all('div', class_='wf-title-med')] if match_header_vs_div else [None, None]
+
+    scoreline_div = soup.find('div', class_='match-header-vs-score')
+    spoiler_div = scoreline_div.find('div', class_='js-spoiler')
+    if spoiler_div:
+        score_elements = spoiler_div.find_all('span')
+        if score_elements:
+            team_1_score = score_elements[0].text.strip()
+            team_2_score = score_elements[-1].text.strip()
+    else:
+        team_1_score = team_2_score = ''
+
+    stage_div = soup.find('div', class_='match-header-vs-note')
+    stage = stage_div.text.strip().replace('\n', '').replace('\t', '') if stage_div else None # Stage, e.g. Final, Semi-final, etc.
+
+    match_type_divs = soup.find_all('div', class_='match-header-vs-note') # Match type, e.g. Best of 3, Best of 5, etc.
+    match_type = match_type_divs[1].text.strip() if len(match_type_divs) > 1 else None
+
+    match_header_date_div = soup.find('div', class_='match-header-date')
+    date_time_div = match_header_date_div.find('div', class_='moment-tz-convert') if match_header_date_div else None
+    date_time = date_time_div.get('data-utc-ts').strip() if date_time_div else None
+    if date_time:
+        date, match_time = date_time.split(' ')
+    else:
+        date = match_time = None
+
+    # Map-specific details
+    stats_container_div = soup.find('div', class_='vm-stats-container')
+    game_divs = stats_container_div.find_all('div', class_='vm-stats-game')
+    game_data = [scrape_game(div) for div in game_divs if scrape_game(div) is not None]
+
+    match_data = {
+        'team_1': team_names[0],
+        'team_2': team_names[1],
+        'event': event_name,
+        'event_series': event_series,
+        'team_1_score': team_1_score,
+        'team_2_score': team_2_score,
+        'stage': stage,
+        'match_type': match_type,
+        'date': date,
+        'time': match_time,
+        'games': game_data,
+        'url': url
+    }
+
+    return match_data
@@ -0,0 +1,37 @@
+"""
+Records vlr.gg pages into benchmarks/pages, so the benchmarks can also run on real pages without hitting vlr.gg again.
+Uses the same HTTP client and proxy settings as the scripts.
+
+Usage: python benchmarks/record_fixtures.py --match bo5 https://www.vlr.gg/... --results page-3 "https://www.vlr.gg/matches/results?page=3"
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fixtures import PAGES_DIR
+from vlr_scraper.http_client import build_client
+
+def main():
+    parser = argparse.ArgumentParser(description='Save vlr.gg match and results pages as benchmark fixtures')
+    parser.add_argument('--match', nargs=2, action='append', default=[], metavar=('NAME', 'URL'), help='Match page to save as pages/match-NAME.html')
+    parser.add_argument('--results', nargs=2, action='append', default=[], metavar=('NAME', 'URL'), help='Results page to save as pages/results-NAME.html')
+    args = parser.parse_args()
+
+    client = build_client()
+    os.makedirs(PAGES_DIR, exist_ok=True)
+    for kind, pages in (('match', args.match), ('results', args.results)):
+        for name, url in pages:
+            response = client.get(url)
+            if response is None or response.status != 200:
+                print(f'Skipping {name}: failed to fetch {url}')
+                continue
+            path = os.path.join(PAGES_DIR, f'{kind}-{name}.html')
+            with open(path, 'wb') as f:
+                f.write(response.body)
+            print(f'Saved {url} to {path} ({len(response.body) / 1024:.0f} KB)')
+    client.close()
+
+if __name__ == '__main__':
+    main()
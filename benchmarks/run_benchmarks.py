@@ -0,0 +1,241 @@
+"""
+Offline benchmark suite. Times the scraper's functions on the fixture corpus (bo1, bo3 and bo5 matches, a forfeit,
+missing and absent stats tables and results pages, plus any pages recorded in benchmarks/pages) in items/sec with their
+peak Python memory, and the whole fetch -> parse -> write pipeline against the local stub server.
+Results are appended to benchmarks/results/history.jsonl and compared with the previous run on the same machine
+and settings, so regressions show up between runs.
+
+Usage: python benchmarks/run_benchmarks.py [--parser lxml] [--only scrape_game end_to_end] [--check]
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from functools import partial
+from typing import Callable, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fixtures import match_corpus, recorded_pages, render_match_page, results_corpus
+from stub_server import StubServer
+from vlr_scraper import match_details, match_urls
+from vlr_scraper.fetcher import fetch_all
+from vlr_scraper.http_client import HttpClient
+from vlr_scraper.parsers import PARSER_BACKENDS, make_soup
+from vlr_scraper.pipeline import run_pipeline
+
+HISTORY_PATH = os.path.join(os.path.dirname(__file__), 'results', 'history.jsonl')
+
+BENCHMARKS = ['get_last_page', 'req', 'scrape_match', 'parse_match', 'scrape_game', 'extract_player_info', 'end_to_end']
+
+def best_rate(function: Callable, items: list, repeat: int, min_time: float) -> float:
+    """
+    Best items/sec out of `repeat` runs, each run goes over the items until it has taken at least `min_time` seconds.
+    """
+    rates = []
+    for _ in range(repeat):
+        done = 0
+        start = time.perf_counter()
+        while True:
+            for item in items:
+                function(item)
+            done += len(items)
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        rates.append(done / elapsed)
+    return max(rates)
+
+def peak_memory(function: Callable, items: list) -> float:
+    """
+    Peak memory allocated by Python while going over the items once, in KB. Timed separately, tracemalloc slows everything down.
+    """
+    tracemalloc.start()
+    try:
+        for item in items:
+            function(item)
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+def match_pages() -> dict[str, tuple[bytes, str]]:
+    """
+    (content, url) of every match page in the corpus by name.
+    """
+    pages = {
+        f'match-{name}': (render_match_page(match).encode('utf-8'), match['url'])
+        for name, match in match_corpus().items()
+    }
+    for name, content in recorded_pages('match').items():
+        pages[name] = (content, f'https://www.vlr.gg/0/{name}')
+    return pages
+
+def results_pages() -> dict[str, bytes]:
+    pages = {f'results-{name}': page.encode('utf-8') for name, page in results_corpus().items()}
+    pages.update(recorded_pages('results'))
+    return pages
+
+def end_to_end(backend: str, pages: int, workers: int, rate: float, latency: float, parse_workers: Optional[int]) -> dict:
+    """
+    Scrapes `pages` match pages from the stub server through fetch_all and run_pipeline into a temporary directory.
+    Memory is the largest RSS of the parser and writer processes.
+    """
+    corpus = list(match_pages().values())
+    paths = {f'/{100000 + i}/match': corpus[i % len(corpus)][0] for i in range(pages)}
+    with StubServer(paths.get, latency=latency) as stub, tempfile.TemporaryDirectory() as directory:
+        client = HttpClient()
+        data_path = os.path.join(directory, 'scraped_data.json')
+        start = time.perf_counter()
+        run_pipeline(
+            fetch_all([stub.url + path for path in paths], client, workers=workers, rate=rate, burst=workers),
+            partial(match_details.parse_match, backend=backend),
+            data_path,
+            os.path.join(directory, 'scraped_urls.log'),
+            parse_workers=parse_workers,
+            total=pages,
+            report_interval=3600
+        )
+        elapsed = time.perf_counter() - start
+        client.close()
+        with open(data_path, 'rb') as f:
+            written = sum(1 for _ in f)
+    if written != pages:
+        sys.exit(f'end_to_end: {written} of {pages} matches were written')
+    return {'rate': pages / elapsed, 'unit': 'pages/s', 'peak_kb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss}
+
+def run(args: argparse.Namespace) -> dict[str, dict]:
+    backend = args.parser
+    matches = match_pages()
+    results = results_pages()
+
+    # Parsed once up front, scrape_game and extract_player_info are timed on their own
+    game_divs = []
+    for content, _ in matches.values():
+        soup = make_soup(content, backend)
+        container = soup.find('div', class_='vm-stats-container')
+        if container:
+            game_divs += [div for div in container.find_all('div', class_='vm-stats-game') if match_details.scrape_game(div) is not None]
+    tables = [table for div in game_divs for table in div.find_all('table', class_='wf-table-inset') if table.find('tr')]
+
+    served = {f'/{name}': content for name, (content, _) in matches.items()}
+    served.update({f'/{name}': content for name, content in results.items()})
+
+    measured = {}
+    with StubServer(served.get) as stub:
+        # The default client uses the proxy from .env, the stub server is local
+        client = HttpClient()
+        benchmarks = {
+            'get_last_page': (partial(match_urls.get_last_page, backend=backend, client=client), [f'{stub.url}/{name}' for name in results], 'pages/s'),
+            'req': (partial(match_urls.req, backend=backend, client=client), [f'{stub.url}/{name}' for name in results], 'pages/s'),
+            'scrape_match': (partial(match_details.scrape_match, backend=backend, client=client), [f'{stub.url}/{name}' for name in matches], 'pages/s'),
+            'parse_match': (lambda page: match_details.parse_match(page[0], page[1], backend), list(matches.values()), 'pages/s'),
+            'scrape_game': (match_details.scrape_game, game_divs, 'games/s'),
+            'extract_player_info': (match_details.extract_player_info, tables, 'tables/s')
+        }
+        for name, (function, items, unit) in benchmarks.items():
+            if args.only and name not in args.only:
+                continue
+            measured[name] = {
+                'rate': best_rate(function, items, args.repeat, args.min_time),
+                'unit': unit,
+                'peak_kb': peak_memory(function, items)
+            }
+            print(f'{name}: {measured[name]["rate"]:.1f} {unit}')
+        client.close()
+
+    if not args.only or 'end_to_end' in args.only:
+        measured['end_to_end'] = end_to_end(backend, args.pages, args.workers, args.rate, args.latency, args.parse_workers)
+        print(f'end_to_end: {measured["end_to_end"]["rate"]:.1f} pages/s')
+    return measured
+
+def load_history(path: str) -> list[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(measured: dict[str, dict], previous: Optional[dict], threshold: float) -> list[str]:
+    """
+    Prints the results next to the previous run's and returns the benchmarks that got slower or use more memory
+    than `threshold` allows.
+    """
+    regressions = []
+    print(f'\n{"benchmark":<22}{"rate":>14}  {"unit":<9}{"peak KB":>10}  vs previous run')
+    for name, result in measured.items():
+        line = f'{name:<22}{result["rate"]:>14.1f}  {result["unit"]:<9}{result["peak_kb"]:>10.0f}'
+        before = (previous or {}).get('results', {}).get(name)
+        if before:
+            speed = result['rate'] / before['rate'] - 1
+            memory = result['peak_kb'] / before['peak_kb'] - 1 if before['peak_kb'] else 0.0
+            line += f'  {speed:+.1%} rate, {memory:+.1%} memory'
+            if speed < -threshold or memory > threshold:
+                line += '  REGRESSION'
+                regressions.append(name)
+        print(line)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the scraper offline on fixture pages and a local stub server')
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default='html.parser', help='HTML parser backend (default: html.parser)')
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, help='Only run these benchmarks')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per benchmark, the best one is reported (default: 3)')
+    parser.add_argument('--min-time', type=float, default=0.5, help='Minimum seconds per timed run (default: 0.5)')
+    parser.add_argument('--pages', type=int, default=300, help='Match pages in the end-to-end run (default: 300)')
+    parser.add_argument('--workers', type=int, default=16, help='Concurrent requests in the end-to-end run (default: 16)')
+    parser.add_argument('--rate', type=float, default=1000.0, help='Requests per second in the end-to-end run (default: 1000)')
+    parser.add_argument('--latency', type=float, default=0.05, help='Stub server latency in seconds for the end-to-end run (default: 0.05)')
+    parser.add_argument('--parse-workers', type=int, default=None, help='Parser processes in the end-to-end run (default: number of CPUs)')
+    parser.add_argument('--threshold', type=float, default=0.15, help='Slowdown or memory growth reported as a regression (default: 0.15)')
+    parser.add_argument('--history', default=HISTORY_PATH, help='Results history file (default: benchmarks/results/history.jsonl)')
+    parser.add_argument('--no-save', action='store_true', help="Don't add this run to the history")
+    parser.add_argument('--check', action='store_true', help='Exit with an error if there is a regression')
+    args = parser.parse_args()
+
+    settings = {
+        'parser': args.parser,
+        'pages': args.pages,
+        'workers': args.workers,
+        'rate': args.rate,
+        'latency': args.latency,
+        'parse_workers': args.parse_workers
+    }
+    measured = run(args)
+
+    # Only runs on the same machine with the same settings are comparable
+    history = load_history(args.history)
+    host = platform.node()
+    previous = next((entry for entry in reversed(history) if entry['host'] == host and entry['settings'] == settings), None)
+    regressions = compare(measured, previous, args.threshold)
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+        with open(args.history, 'a') as f:
+            f.write(json.dumps({
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'commit': git_commit(),
+                'host': host,
+                'python': platform.python_version(),
+                'settings': settings,
+                'results': measured
+            }) + '\n')
+
+    if regressions:
+        print(f'\nRegressions: {", ".join(regressions)}')
+        if args.check:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
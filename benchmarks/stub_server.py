@@ -0,0 +1,225 @@
+"""
+Local HTTP server that serves fixture pages and injects faults, to exercise the HTTP client and the fetch pipeline
+without hitting vlr.gg.
+
+Usage: python benchmarks/stub_server.py [--port 8765] [--error-rate 0.1] [--drop-rate 0.05] [--latency 0.05]
+"""
+import argparse
+import gzip
+import hashlib
+import random
+import select
+import socket
+import socketserver
+import ssl
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+class StubServer:
+    """
+    Serves `pages(path) -> bytes or None` over HTTP/1.1 with keep-alive and gzip.
+    Faults are injected at random: `rate_limit_rate` of the requests get a 429 with a Retry-After of `retry_after` seconds,
+    `error_rate` get a 503 and `drop_rate` have their connection closed without a response. Every response waits `latency` seconds.
+    With `etags`, pages are sent with an ETag and a matching If-None-Match gets a 304.
+    With a `certfile` and `keyfile` it serves HTTPS instead.
+    Counts requests, connections and statuses so callers can check what happened.
+    """
+
+    def __init__(self, pages: Callable[[str], Optional[bytes]], port: int = 0, latency: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after: float = 1.0, drop_rate: float = 0.0, seed: Optional[int] = None,
+                 etags: bool = False, certfile: Optional[str] = None, keyfile: Optional[str] = None):
+        self.pages = pages
+        self.etags = etags
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.statuses = {}
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                with stub.lock:
+                    stub.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                with stub.lock:
+                    stub.requests += 1
+                    roll = stub.random.random()
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                if roll < stub.drop_rate:
+                    stub.count(None)
+                    self.close_connection = True
+                    return
+                roll -= stub.drop_rate
+                if roll < stub.rate_limit_rate:
+                    return self.reply(429, b'Too Many Requests', {'Retry-After': f'{stub.retry_after:g}'})
+                roll -= stub.rate_limit_rate
+                if roll < stub.error_rate:
+                    return self.reply(503, b'Service Unavailable')
+
+                body = stub.pages(self.path)
+                if body is None:
+                    return self.reply(404, b'Not Found')
+                if stub.etags:
+                    etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+                    if self.headers.get('If-None-Match') == etag:
+                        return self.reply(304, b'', {'ETag': etag})
+                    return self.reply(200, body, {'ETag': etag})
+                self.reply(200, body)
+
+            def reply(self, status: int, body: bytes, headers: Optional[dict] = None):
+                stub.count(status)
+                if body and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    body = gzip.compress(body, compresslevel=1)
+                    headers = {**(headers or {}), 'Content-Encoding': 'gzip'}
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        class Server(ThreadingHTTPServer):
+            def handle_error(self, request, client_address):
+                # Clients that hang up mid-response (killed workers, timeouts) are expected here
+                if not isinstance(sys.exc_info()[1], ConnectionError):
+                    super().handle_error(request, client_address)
+
+        self.server = Server(('127.0.0.1', port), Handler)
+        self.server.daemon_threads = True
+        self.scheme = 'http'
+        if certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            self.server.socket = context.wrap_socket(self.server.socket, server_side=True)
+            self.scheme = 'https'
+        self.thread = threading.Thread(target=self.server.serve_forever, name='stub-server', daemon=True)
+
+    def count(self, status: Optional[int]) -> None:
+        with self.lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    @property
+    def url(self) -> str:
+        return f'{self.scheme}://127.0.0.1:{self.server.server_address[1]}'
+
+    def __enter__(self) -> 'StubServer':
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+class ConnectProxy:
+    """
+    Forward proxy that only does CONNECT tunnels, like the proxy of .env does for HTTPS sites.
+    Records the Proxy-Authorization header and the first bytes the client sends into each tunnel,
+    which for HTTPS have to be a TLS handshake and not the request itself.
+    """
+
+    def __init__(self, port: int = 0):
+        self.lock = threading.Lock()
+        self.tunnels = []
+        self.authorizations = []
+        self.first_bytes = []
+
+        proxy = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                request_line = self.rfile.readline().decode('latin-1')
+                headers = {}
+                while (line := self.rfile.readline().decode('latin-1').strip()):
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                method, target, _ = request_line.split(' ', 2)
+                if method != 'CONNECT':
+                    self.wfile.write(b'HTTP/1.1 405 Method Not Allowed\r\nContent-Length: 0\r\n\r\n')
+                    return
+                host, _, port = target.rpartition(':')
+                with proxy.lock:
+                    proxy.tunnels.append(target)
+                    proxy.authorizations.append(headers.get('proxy-authorization'))
+                upstream = socket.create_connection((host, int(port)))
+                self.wfile.write(b'HTTP/1.1 200 Connection established\r\n\r\n')
+                self.wfile.flush()
+                self.pipe(upstream)
+
+            def pipe(self, upstream: socket.socket):
+                first = True
+                sockets = [self.connection, upstream]
+                try:
+                    while True:
+                        readable, _, _ = select.select(sockets, [], [])
+                        for source in readable:
+                            data = source.recv(65536)
+                            if not data:
+                                return
+                            if source is self.connection and first:
+                                first = False
+                                with proxy.lock:
+                                    proxy.first_bytes.append(data[:16])
+                            (upstream if source is self.connection else self.connection).sendall(data)
+                except OSError:
+                    pass
+                finally:
+                    upstream.close()
+
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name='connect-proxy', daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def __enter__(self) -> 'ConnectProxy':
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a synthetic match page on every path, with injected faults')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds before each response (default: 0)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of 503 responses (default: 0)')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of 429 responses with a Retry-After (default: 0)')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='Fraction of connections closed without a response (default: 0)')
+    args = parser.parse_args()
+
+    from fixtures import load_example, render_match_page
+
+    page = render_match_page(load_example()).encode('utf-8')
+    stub = StubServer(lambda path: page, args.port, args.latency, args.error_rate, args.rate_limit_rate, drop_rate=args.drop_rate)
+    print(f'Serving on {stub.url}')
+    with stub:
+        try:
+            stub.thread.join()
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+"""
+Runs vlr_scraper.export_parquet, so `python export_parquet.py` keeps working from a checkout. The code lives in the vlr_scraper package.
+"""
+from vlr_scraper.export_parquet import main
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+"""
+Runs vlr_scraper.match_index, so `python match_index.py <match id> [data file]` keeps working from a checkout. The code lives in the vlr_scraper package.
+"""
+from vlr_scraper.match_index import main
+
+if __name__ == '__main__':
+    main()
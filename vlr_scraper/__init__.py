@@ -0,0 +1,42 @@
+"""
+Scraper for vlr.gg match results: match URLs, match details with per-map player stats, and the tools around them.
+
+The public names below are imported from their submodules on first use, so `import vlr_scraper` reads no files,
+opens no connections and doesn't load bs4, lxml, tqdm or pyarrow until something needs them.
+"""
+import importlib
+
+# Public name -> submodule it lives in
+_EXPORTS = {
+    'scrape_match_html': 'api',
+    'iter_matches': 'api',
+    'iter_cached_matches': 'api',
+    'parse_match': 'match_details',
+    'extract_match': 'match_details',
+    'scrape_match': 'match_details',
+    'scrape_game': 'match_details',
+    'extract_player_info': 'match_details',
+    'parse_results_page': 'match_urls',
+    'parse_last_page': 'match_urls',
+    'HttpClient': 'http_client',
+    'build_client': 'http_client',
+    'HtmlCache': 'html_cache',
+    'MatchIndex': 'match_index',
+    'match_id': 'match_index',
+    'read_matches': 'export_parquet',
+    'PARSER_BACKENDS': 'parsers'
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    # Cache it, so the next lookup doesn't go through __getattr__
+    globals()[name] = value
+    return value
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,300 @@
+"""
+Career aggregates of the scraped matches per player, team and agent, streamed from the NDJSON data file.
+
+Each key keeps a fixed-size list of sums per side (both, t and ct), so memory grows with the number of players,
+teams and agents and not with the number of matches. Averages like ACS, ADR, rating, KAST and HS% are weighted
+by the rounds played on that side, counts (kills, deaths, first kills...) are summed.
+The sums are saved with the byte offset of the data file they cover, so the next run only reads the matches appended since.
+"""
+import argparse
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional
+from .export_parquet import clean, to_number
+from .match_index import MatchIndex, match_id
+
+SIDES = ['both', 't', 'ct']
+
+# Summed per side
+COUNTS = ['maps', 'wins', 'rounds', 'rounds_won', 'kills', 'deaths', 'assists', 'fk', 'fd']
+COUNT_STATS = [('kills', 'kill_stats'), ('deaths', 'death_stats'), ('assists', 'assist_stats'), ('fk', 'fk_stats'), ('fd', 'fd_stats')]
+
+# Averaged per side, weighted by the rounds played: the sum of value * rounds and the rounds with a value
+WEIGHTED_STATS = [('rating', 'r_stats'), ('acs', 'acs_stats'), ('adr', 'adr_stats'), ('kast', 'kast_stats'), ('headshot', 'headshot_stats')]
+
+FIELDS = COUNTS + [name + suffix for name, _ in WEIGHTED_STATS for suffix in ('_sum', '_rounds')]
+FIELD_INDEX = {name: i for i, name in enumerate(FIELDS)}
+# Sums of every side one after the other in a single list per key
+SIDE_OFFSET = {side: i * len(FIELDS) for i, side in enumerate(SIDES)}
+
+KINDS = ['players', 'teams', 'agents']
+
+def new_aggregates() -> dict[str, dict[str, list[float]]]:
+    return {kind: {} for kind in KINDS}
+
+def _sums(aggregates: dict, kind: str, key: Optional[str]) -> Optional[list[float]]:
+    if key is None:
+        return None
+    sums = aggregates[kind].get(key)
+    if sums is None:
+        sums = aggregates[kind][key] = [0.0] * (len(FIELDS) * len(SIDES))
+    return sums
+
+def side_rounds(overview: dict, opponent: dict) -> dict[str, tuple[Optional[int], Optional[int]]]:
+    """
+    (rounds played, rounds won) on each side of a map for the team. A team plays a T round whenever the opponent plays
+    a CT round, so its T rounds are its own T wins plus the opponent's CT wins. Overtime rounds only count for both.
+    """
+    score = to_number(overview.get('score'), int)
+    opponent_score = to_number(opponent.get('score'), int)
+    t_won = to_number(overview.get('t_side_score'), int)
+    ct_won = to_number(overview.get('ct_side_score'), int)
+    opponent_t_won = to_number(opponent.get('t_side_score'), int)
+    opponent_ct_won = to_number(opponent.get('ct_side_score'), int)
+    return {
+        'both': (score + opponent_score if score is not None and opponent_score is not None else None, score),
+        't': (t_won + opponent_ct_won if t_won is not None and opponent_ct_won is not None else None, t_won),
+        'ct': (ct_won + opponent_t_won if ct_won is not None and opponent_t_won is not None else None, ct_won)
+    }
+
+def _add_map(sums: list[float], rounds: dict, won: bool, sign: int) -> None:
+    for side, (played, won_rounds) in rounds.items():
+        if not played:
+            continue
+        base = SIDE_OFFSET[side]
+        sums[base + FIELD_INDEX['maps']] += sign
+        sums[base + FIELD_INDEX['wins']] += sign * won
+        sums[base + FIELD_INDEX['rounds']] += sign * played
+        sums[base + FIELD_INDEX['rounds_won']] += sign * (won_rounds or 0)
+
+def _add_player_stats(sums: list[float], player: dict, rounds: dict, sign: int) -> None:
+    for side, (played, _) in rounds.items():
+        if not played:
+            continue
+        base = SIDE_OFFSET[side]
+        for field, key in COUNT_STATS:
+            value = to_number((player.get(key) or {}).get(side), int)
+            if value is not None:
+                sums[base + FIELD_INDEX[field]] += sign * value
+        for field, key in WEIGHTED_STATS:
+            value = to_number((player.get(key) or {}).get(side), float)
+            if value is not None:
+                sums[base + FIELD_INDEX[field + '_sum']] += sign * value * played
+                sums[base + FIELD_INDEX[field + '_rounds']] += sign * played
+
+def add_match(aggregates: dict, match: dict, sign: int = 1) -> None:
+    """
+    Adds a match record to the aggregates, or takes it out again with sign=-1 (when a refreshed record replaces it).
+    Players and agents count one map per player per map, teams one per map, with the stats of their players.
+    """
+    for game in match.get('games') or []:
+        for team, opponent in (('team_left', 'team_right'), ('team_right', 'team_left')):
+            overview = game[team]['team_overview']
+            opponent_overview = game[opponent]['team_overview']
+            rounds = side_rounds(overview, opponent_overview)
+            score = to_number(overview.get('score'), int)
+            opponent_score = to_number(opponent_overview.get('score'), int)
+            won = score is not None and opponent_score is not None and score > opponent_score
+
+            team_sums = _sums(aggregates, 'teams', clean(overview.get('name')))
+            if team_sums is not None:
+                _add_map(team_sums, rounds, won, sign)
+            for player in game[team]['players'] or []:
+                for sums in (_sums(aggregates, 'players', clean(player.get('name'))), _sums(aggregates, 'agents', clean(player.get('agent')))):
+                    if sums is not None:
+                        _add_map(sums, rounds, won, sign)
+                        _add_player_stats(sums, player, rounds, sign)
+                if team_sums is not None:
+                    _add_player_stats(team_sums, player, rounds, sign)
+
+def merge_aggregates(into: dict, other: dict) -> None:
+    for kind in KINDS:
+        for key, sums in other[kind].items():
+            existing = into[kind].get(key)
+            if existing is None:
+                into[kind][key] = sums
+            else:
+                for i, value in enumerate(sums):
+                    existing[i] += value
+
+def _lines(f, start: int, end: int) -> Iterator[tuple[int, bytes]]:
+    """
+    (offset, line) of the lines starting in [start, end) of the open file. A line belongs to the range it starts in.
+    """
+    if start > 0:
+        f.seek(start - 1)
+        # Skip the rest of a line that started in the previous range
+        f.readline()
+    offset = f.tell()
+    while offset < end:
+        line = f.readline()
+        if not line:
+            break
+        yield offset, line
+        offset += len(line)
+
+def aggregate_range(data_path: str, start: int, end: int, index: MatchIndex, previous: MatchIndex) -> dict:
+    """
+    Aggregates the records that start in [start, end) of the data file and are the last record of their match in `index`.
+    When `previous` (the index the saved aggregates were built with) has an older record of the match, it's taken out,
+    so the aggregates always count the last record of each match once.
+    """
+    aggregates = new_aggregates()
+    with open(data_path, 'rb') as f, open(data_path, 'rb') as old:
+        for offset, line in _lines(f, start, end):
+            if not line.strip():
+                continue
+            match = json.loads(line)
+            id_ = match_id(match['url'])
+            if id_ is not None and index.offset(id_) != offset:
+                # Superseded by a later record of the same match
+                continue
+            add_match(aggregates, match)
+            old_offset = previous.offset(id_) if id_ is not None else None
+            if old_offset is not None:
+                old.seek(old_offset)
+                add_match(aggregates, json.loads(old.readline()), sign=-1)
+    return aggregates
+
+def _aggregate_range_worker(data_path: str, start: int, end: int, index_path: str, previous_path: str) -> dict:
+    index = MatchIndex(data_path, index_path)
+    index.load()
+    previous = MatchIndex(data_path, previous_path)
+    previous.load()
+    return aggregate_range(data_path, start, end, index, previous)
+
+def byte_ranges(start: int, end: int, parts: int) -> list[tuple[int, int]]:
+    step = max(1, -(-(end - start) // parts))
+    return [(i, min(i + step, end)) for i in range(start, end, step)]
+
+def _snapshot(index: MatchIndex, path: str) -> MatchIndex:
+    """
+    Saves a copy of the index at `path`, so worker processes and the next run see the same index whatever the scraper does.
+    """
+    snapshot = MatchIndex(index.data_path, path)
+    snapshot.ids, snapshot.offsets, snapshot.inode, snapshot.covered = index.ids, index.offsets, index.inode, index.covered
+    snapshot.save()
+    return snapshot
+
+def load_state(state_path: str, data_path: str) -> tuple[dict, MatchIndex]:
+    """
+    The saved aggregates and the index they were built with, or empty ones if there are none
+    or the data file was replaced or truncated since (e.g. rebuilt with --reparse-from-cache).
+    """
+    previous = MatchIndex(data_path, state_path + '.idx')
+    if os.path.exists(state_path) and os.path.exists(data_path):
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+        previous.load()
+        stat = os.stat(data_path)
+        if (state.get('fields') == FIELDS and state['covered'] == previous.covered
+                and previous.inode == stat.st_ino and previous.covered <= stat.st_size):
+            return state['aggregates'], previous
+        print(f'{data_path} was rewritten since {state_path} was saved, aggregating from scratch')
+    return new_aggregates(), MatchIndex(data_path, state_path + '.idx')
+
+def save_state(state_path: str, aggregates: dict, index: MatchIndex) -> None:
+    with open(state_path + '.tmp', 'w') as f:
+        json.dump({'fields': FIELDS, 'covered': index.covered, 'aggregates': aggregates}, f)
+    # The index goes first: if the process stops in between, the covered offsets don't match and the next run starts over
+    _snapshot(index, state_path + '.idx')
+    os.replace(state_path + '.tmp', state_path)
+
+def update(data_path: str, state_path: str, workers: int = 1, full: bool = False) -> dict:
+    """
+    Brings the saved aggregates up to date with the data file and returns them. Only the records appended since the
+    last run are read, unless `full` is set or the state can't be used. With several `workers`, the new part of the file
+    is split into byte ranges that are aggregated by separate processes and summed.
+    """
+    if full:
+        aggregates, previous = new_aggregates(), MatchIndex(data_path, state_path + '.idx')
+    else:
+        aggregates, previous = load_state(state_path, data_path)
+    index = MatchIndex.open(data_path)
+    start, end = previous.covered, index.covered
+    if end > start:
+        print(f'Aggregating {(end - start) / 1024 ** 2:.1f} MB of {data_path} from offset {start}')
+
+    if workers > 1 and end - start > 1 << 20:
+        # The workers load the indexes from files that nothing else writes to
+        snapshot = _snapshot(index, state_path + '.next.idx')
+        previous_path = state_path + '.previous.idx'
+        _snapshot(previous, previous_path)
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [
+                pool.submit(_aggregate_range_worker, data_path, range_start, range_end, snapshot.index_path, previous_path)
+                for range_start, range_end in byte_ranges(start, end, workers)
+            ]
+            for future in futures:
+                merge_aggregates(aggregates, future.result())
+        os.remove(snapshot.index_path)
+        os.remove(previous_path)
+    elif end > start:
+        merge_aggregates(aggregates, aggregate_range(data_path, start, end, index, previous))
+
+    save_state(state_path, aggregates, index)
+    return aggregates
+
+def _ratio(numerator: float, denominator: float) -> Optional[float]:
+    return round(numerator / denominator, 3) if denominator else None
+
+def summarize(sums: list[float]) -> dict:
+    """
+    Output columns of a key: counts and weighted averages per side, with K/D, FK per round and FK share
+    (first kills out of first duels). Side columns end in _t and _ct.
+    """
+    row = {}
+    for side in SIDES:
+        base = SIDE_OFFSET[side]
+        value = {name: sums[base + i] for i, name in enumerate(FIELDS)}
+        suffix = '' if side == 'both' else f'_{side}'
+        row['maps' + suffix] = round(value['maps'])
+        if side == 'both':
+            row['wins'] = round(value['wins'])
+            row['win_rate'] = _ratio(value['wins'], value['maps'])
+        row['rounds' + suffix] = round(value['rounds'])
+        row['round_win_rate' + suffix] = _ratio(value['rounds_won'], value['rounds'])
+        for field, _ in WEIGHTED_STATS:
+            row[field + suffix] = _ratio(value[field + '_sum'], value[field + '_rounds'])
+        for field in ('kills', 'deaths', 'assists', 'fk', 'fd'):
+            row[field + suffix] = round(value[field])
+        row['kd' + suffix] = _ratio(value['kills'], value['deaths'])
+        row['fk_per_round' + suffix] = _ratio(value['fk'], value['rounds'])
+        row['fk_share' + suffix] = _ratio(value['fk'], value['fk'] + value['fd'])
+    return row
+
+def write_csv(aggregates: dict, output_dir: str) -> None:
+    """
+    Writes players.csv, teams.csv and agents.csv to output_dir, one row per key sorted by maps played.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    for kind in KINDS:
+        rows = sorted(
+            ({kind[:-1]: key, **summarize(sums)} for key, sums in aggregates[kind].items()),
+            key=lambda row: (-row['maps'], row[kind[:-1]])
+        )
+        path = os.path.join(output_dir, f'{kind}.csv')
+        with open(path + '.tmp', 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=[kind[:-1]] + list(summarize([0.0] * len(FIELDS) * len(SIDES))))
+            writer.writeheader()
+            # Keys whose matches were all replaced by refreshed records without them are left with no maps
+            writer.writerows(row for row in rows if row['maps'] > 0)
+        os.replace(path + '.tmp', path)
+        print(f'Wrote {path}')
+
+def main():
+    parser = argparse.ArgumentParser(description='Aggregate the scraped matches per player, team and agent')
+    parser.add_argument('--input', default='./data/scraped_data.json', help='NDJSON data file (default: ./data/scraped_data.json)')
+    parser.add_argument('--output', default='./data/aggregates', help='Directory of the CSV files and the saved state (default: ./data/aggregates)')
+    parser.add_argument('--workers', type=int, default=1, help='Processes aggregating byte ranges of the file in parallel (default: 1)')
+    parser.add_argument('--full', action='store_true', help='Ignore the saved state and aggregate the whole file again')
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    aggregates = update(args.input, os.path.join(args.output, 'state.json'), workers=args.workers, full=args.full)
+    write_csv(aggregates, args.output)
+
+if __name__ == '__main__':
+    main()
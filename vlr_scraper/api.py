@@ -0,0 +1,55 @@
+"""
+Library API, for using the scraper from other code (an ingestion service, worker processes, notebooks)
+instead of running the scripts.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, Union
+from .match_details import parse_match
+
+# Like match_details, only the parsing code is imported up front: scrape_match_html doesn't pay for the event loop,
+# the HTTP client or SQLite, which are imported by the functions that fetch or read the cache.
+if TYPE_CHECKING:
+    from .html_cache import HtmlCache
+    from .http_client import HttpClient
+
+def scrape_match_html(content: Union[bytes, str], url: Optional[str] = None, backend: str = 'html.parser') -> dict:
+    """
+    Parses the HTML of a match page into the match dict, without any network I/O.
+    `url` is only stored in the dict, like the scraped records have it.
+    """
+    return parse_match(content, url, backend)
+
+def _parse_pages(pages: Iterable[tuple[str, Optional[int], Optional[bytes]]], backend: str) -> Iterator[dict]:
+    for url, status, content in pages:
+        if content is None:
+            continue
+        try:
+            match_data = parse_match(content, url, backend)
+        except Exception as e:
+            print(f'Failed to parse {url}: {str(e)}')
+            continue
+        if match_data is not None:
+            yield match_data
+
+def iter_matches(urls: Iterable[str], client: Optional[HttpClient] = None, workers: int = 1, rate: float = 2.0, burst: int = 1,
+                 backend: str = 'html.parser', cache: Optional[HtmlCache] = None) -> Iterator[dict]:
+    """
+    Fetches the match pages concurrently and yields the match dicts as they're parsed, in completion order.
+    Parsing happens in the caller's thread as it iterates, and the fetchers only run a few pages ahead of it,
+    so memory stays flat however many URLs there are. Pages that fail to fetch or parse are skipped.
+    The client defaults to the shared one with the .env proxy settings, and fetched pages are stored in `cache` if given.
+    """
+    from .fetcher import fetch_all
+    from .http_client import default_client
+
+    pages = fetch_all(urls, client or default_client(), workers=workers, rate=rate, burst=burst, cache=cache)
+    yield from _parse_pages(pages, backend)
+
+def iter_cached_matches(cache: HtmlCache, backend: str = 'html.parser') -> Iterator[dict]:
+    """
+    Yields the match dict of every page in the HTML cache, without any network I/O.
+    """
+    from .html_cache import cached_pages
+
+    yield from _parse_pages(cached_pages(cache), backend)
@@ -0,0 +1,211 @@
+"""
+Coordinator/worker mode: several nodes share one crawl through a WorkQueue of match IDs.
+
+    seed    (coordinator) queues the URLs of match_urls.json that aren't in scraped_data.json yet
+    work    (every node)  claims batches of matches, scrapes them into its own shard and marks them done
+    status                shows the jobs by state and the workers holding leases
+    merge   (coordinator) appends the shards to scraped_data.json, keeping one record per match ID
+"""
+import json
+import os
+import socket
+import threading
+import time
+from functools import partial
+from glob import glob
+from typing import Callable
+from .match_index import MatchIndex, match_id
+from .work_queue import WorkQueue
+
+def shard_paths(shard_dir: str, worker: str) -> tuple[str, str]:
+    """
+    Data file and scraped URLs log of a worker's shard.
+    """
+    directory = os.path.join(shard_dir, worker)
+    return os.path.join(directory, 'scraped_data.json'), os.path.join(directory, 'scraped_urls.log')
+
+def seed_queue(queue: WorkQueue, urls_path: str, data_path: str) -> int:
+    """
+    Queues the match URLs of `urls_path` that aren't in the data file yet, returns the number of new jobs.
+    """
+    with open(urls_path, 'r') as f:
+        urls = json.load(f)
+    index = MatchIndex.open(data_path) if os.path.exists(data_path) else None
+    if index is not None:
+        urls = [url for url in urls if match_id(url) not in index]
+    return queue.add(urls)
+
+def _renew_leases(queue_path: str, lease_seconds: float, worker: str, batch: list[int], stop: threading.Event) -> None:
+    """
+    Heartbeat thread: renews the worker's leases on the batch every third of the lease time until `stop` is set.
+    """
+    # SQLite connections can't be shared between threads, the heartbeat has its own
+    queue = WorkQueue(queue_path, lease_seconds=lease_seconds)
+    try:
+        while not stop.wait(lease_seconds / 3):
+            held = queue.renew(worker, batch)
+            if held < len(batch):
+                print(f'Lost the lease on {len(batch) - held} of {len(batch)} matches, another worker may scrape them too')
+    finally:
+        queue.close()
+
+def run_worker(queue: WorkQueue, worker: str, shard_dir: str, parse: Callable[[bytes, str], dict], client,
+               batch_size: int = 100, workers: int = 1, rate: float = 2.0, burst: int = 1, cache=None,
+               poll_interval: float = 10.0, **pipeline_options) -> int:
+    """
+    Claims batches of matches from the queue and scrapes each batch through fetch_all and run_pipeline into the worker's shard,
+    renewing the leases while it works. Matches are marked done once their records are committed to the shard,
+    the others go back to the queue. Stops when nothing is pending or leased, waiting for leases held by other
+    workers in case they expire. Returns the number of matches scraped.
+    """
+    from .fetcher import fetch_all
+    from .ndjson_writer import recover_ndjson
+    from .pipeline import run_pipeline
+
+    data_path, log_path = shard_paths(shard_dir, worker)
+    os.makedirs(os.path.dirname(data_path), exist_ok=True)
+    recover_ndjson(data_path, log_path)
+    index = MatchIndex.open(data_path)
+
+    scraped = 0
+    while True:
+        jobs = queue.claim(worker, batch_size)
+        if not jobs:
+            counts = queue.counts()
+            if not counts['pending'] and not counts['leased']:
+                break
+            print(f'Nothing to claim, {counts["leased"]} matches are leased by other workers. Waiting {poll_interval:g}s')
+            time.sleep(poll_interval)
+            continue
+
+        batch = [id_ for id_, _ in jobs]
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=_renew_leases, args=(queue.path, queue.lease_seconds, worker, batch, stop), daemon=True)
+        heartbeat.start()
+        try:
+            pages = fetch_all([url for _, url in jobs], client, workers=workers, rate=rate, burst=burst, cache=cache)
+            run_pipeline(pages, parse, data_path, log_path, total=len(jobs), **pipeline_options)
+        finally:
+            stop.set()
+            heartbeat.join()
+
+        # The writer has committed the records by now, the shard is the record of what was scraped
+        index.refresh()
+        done = [id_ for id_ in batch if id_ in index]
+        failed = [id_ for id_ in batch if id_ not in index]
+        queue.complete(worker, done)
+        queue.release(worker, failed)
+        scraped += len(done)
+        print(f'Batch done: {len(done)} scraped, {len(failed)} failed. Queue: {queue.counts()}')
+
+    index.save()
+    return scraped
+
+def merge_shards(shard_dir: str, data_path: str, log_path: str) -> tuple[int, int]:
+    """
+    Appends the records of every shard in `shard_dir` to the data file, skipping matches that are already in it or
+    that an earlier shard had (a match is scraped twice when a lease expires under a slow worker).
+    Merging again only adds what the shards gained since. Returns (records added, duplicates skipped).
+    """
+    from .ndjson_writer import NdjsonWriter, recover_ndjson
+
+    recover_ndjson(data_path, log_path)
+    index = MatchIndex.open(data_path)
+    merged = set()
+    added = duplicates = 0
+    writer = NdjsonWriter(data_path, log_path, flush_every=1000)
+    try:
+        for shard_data_path in sorted(glob(os.path.join(shard_dir, '*', 'scraped_data.json'))):
+            recover_ndjson(shard_data_path, os.path.join(os.path.dirname(shard_data_path), 'scraped_urls.log'))
+            with open(shard_data_path, 'r') as f:
+                for line in f:
+                    record = json.loads(line)
+                    id_ = match_id(record['url'])
+                    if id_ in index or id_ in merged:
+                        duplicates += 1
+                        continue
+                    if id_ is not None:
+                        merged.add(id_)
+                    writer.write(record)
+                    added += 1
+    finally:
+        writer.close()
+    index.refresh()
+    index.save()
+    return added, duplicates
+
+def main():
+    import argparse
+    from .http_client import default_client
+    from .match_details import add_scrape_arguments, open_cache, parse_match, run_pipeline_options
+
+    parser = argparse.ArgumentParser(description='Share a scrape between several nodes through a job queue of match IDs')
+    parser.add_argument('--queue', default='./data/work_queue.db', help='Job queue database, on storage every node can reach (default: ./data/work_queue.db)')
+    parser.add_argument('--shard-dir', default='./data/shards', help='Directory of the workers\' shards (default: ./data/shards)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    seed = commands.add_parser('seed', help='Queue the matches of match_urls.json that haven\'t been scraped yet')
+    seed.add_argument('--urls', default='./data/match_urls.json', help='Match URLs to queue (default: ./data/match_urls.json)')
+    seed.add_argument('--data-file', default='./data/scraped_data.json', help='Data file the shards are merged into, its matches aren\'t queued (default: ./data/scraped_data.json)')
+    seed.add_argument('--retry-failed', action='store_true', help='Also put the matches that failed too many times back in the queue')
+
+    work = commands.add_parser('work', help='Scrape matches from the queue into this worker\'s shard until the queue is empty')
+    work.add_argument('--worker-id', default=None, help='Name of this worker and its shard (default: <hostname>-<pid>)')
+    work.add_argument('--batch-size', type=int, default=100, help='Matches claimed at a time (default: 100)')
+    work.add_argument('--lease-seconds', type=float, default=600.0, help='Seconds before the matches of a worker that stopped go back to the queue (default: 600)')
+    work.add_argument('--max-attempts', type=int, default=5, help='Attempts before a match is set aside as failed (default: 5)')
+    work.add_argument('--poll-interval', type=float, default=10.0, help='Seconds between claims while other workers hold the remaining matches (default: 10)')
+    add_scrape_arguments(work, output_dir='<shard>')
+
+    commands.add_parser('status', help='Show the jobs by state and the workers holding leases')
+
+    merge = commands.add_parser('merge', help='Append the shards to scraped_data.json, one record per match')
+    merge.add_argument('--data-file', default='./data/scraped_data.json', help='Data file to merge into (default: ./data/scraped_data.json)')
+    merge.add_argument('--log-file', default='./data/scraped_urls.log', help='Scraped URLs log of the data file (default: ./data/scraped_urls.log)')
+    args = parser.parse_args()
+
+    if args.command == 'seed':
+        queue = WorkQueue(args.queue)
+        if args.retry_failed:
+            print(f'Put {queue.retry_failed()} failed matches back in the queue')
+        added = seed_queue(queue, args.urls, args.data_file)
+        print(f'Queued {added} matches. Queue: {queue.counts()}')
+        queue.close()
+
+    elif args.command == 'work':
+        worker = args.worker_id or f'{socket.gethostname()}-{os.getpid()}'
+        queue = WorkQueue(args.queue, lease_seconds=args.lease_seconds, max_attempts=args.max_attempts)
+        cache = None if args.no_cache else open_cache(args)
+        scraped = run_worker(
+            queue,
+            worker,
+            args.shard_dir,
+            partial(parse_match, backend=args.parser),
+            default_client(),
+            batch_size=args.batch_size,
+            workers=args.workers,
+            rate=args.rate,
+            burst=args.burst,
+            cache=cache,
+            poll_interval=args.poll_interval,
+            **run_pipeline_options(args, os.path.join(args.shard_dir, worker))
+        )
+        print(f'Worker {worker} scraped {scraped} matches. Queue: {queue.counts()}')
+        if cache:
+            cache.close()
+        queue.close()
+
+    elif args.command == 'status':
+        queue = WorkQueue(args.queue)
+        print(', '.join(f'{state}: {count}' for state, count in queue.counts().items()))
+        for worker, count, expires_in in queue.workers():
+            print(f'  {worker}: {count} leased, lease expires in {expires_in:.0f}s')
+        queue.close()
+
+    elif args.command == 'merge':
+        added, duplicates = merge_shards(args.shard_dir, args.data_file, args.log_file)
+        print(f'Merged {added} matches into {args.data_file}, skipped {duplicates} duplicates')
+
+# Parser worker processes import the parsing code from match_details, not this module
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+import argparse
+import datetime
+import json
+import queue
+import threading
+from typing import Iterator, Optional
+from .match_index import MatchIndex, match_id
+
+SIDES = [('both', ''), ('t', '_t'), ('ct', '_ct')]
+
+# Player stats: key in the player dict -> column name prefix and type
+PLAYER_STATS = [
+    ('r_stats', 'rating', float),
+    ('acs_stats', 'acs', int),
+    ('kill_stats', 'kills', int),
+    ('death_stats', 'deaths', int),
+    ('assist_stats', 'assists', int),
+    ('kd_diff_stats', 'kd_diff', int),
+    ('kast_stats', 'kast', float),
+    ('adr_stats', 'adr', float),
+    ('headshot_stats', 'headshot', float),
+    ('fk_stats', 'fk', int),
+    ('fd_stats', 'fd', int),
+    ('fk_diff_stats', 'fk_diff', int)
+]
+
+def clean(value: Optional[str]) -> Optional[str]:
+    """
+    Collapses the \\t and \\n runs left in the scraped strings, empty strings become None.
+    """
+    if value is None:
+        return None
+    value = ' '.join(value.split())
+    return value or None
+
+def to_number(value: Optional[str], cast: type):
+    """
+    Casts stats like '1.44', '76%', '+9' or '/ 13' to a number, None if there's no number.
+    """
+    value = clean(value)
+    if value is None:
+        return None
+    value = value.replace('%', '').replace('+', '').replace('/', '').strip()
+    try:
+        return cast(float(value)) if cast is int else cast(value)
+    except ValueError:
+        return None
+
+def duration_seconds(value: Optional[str]) -> Optional[int]:
+    value = clean(value)
+    if not value:
+        return None
+    seconds = 0
+    try:
+        for part in value.split(':'):
+            seconds = seconds * 60 + int(part)
+    except ValueError:
+        return None
+    return seconds
+
+def flatten_match(match: dict) -> tuple[dict, list[dict], list[dict]]:
+    """
+    Flattens a match record into one matches row, one games row per map and one player_game_stats row per player per map.
+    """
+    id_ = match_id(match['url'])
+    event = clean(match.get('event'))
+    date = match.get('date')
+    partition = {'event': event, 'month': date[:7] if date else None}
+
+    match_row = {
+        'match_id': id_,
+        'url': match['url'],
+        'team_1': clean(match.get('team_1')),
+        'team_2': clean(match.get('team_2')),
+        'event': event,
+        'event_series': clean(match.get('event_series')),
+        'team_1_score': to_number(match.get('team_1_score'), int),
+        'team_2_score': to_number(match.get('team_2_score'), int),
+        'stage': clean(match.get('stage')),
+        'match_type': clean(match.get('match_type')),
+        'date': datetime.date.fromisoformat(date) if date else None,
+        'time': match.get('time'),
+        'maps': len(match.get('games') or []),
+        **partition
+    }
+
+    game_rows = []
+    player_rows = []
+    for game_number, game in enumerate(match.get('games') or [], start=1):
+        # Map names look like 'Haven\t\t...\n\t\tPICK' when the map was picked by the left team
+        map_words = (game['map'].get('name') or '').split()
+        picked = bool(map_words) and map_words[-1] == 'PICK'
+        map_name = ' '.join(map_words[:-1] if picked else map_words) or None
+
+        game_row = {
+            'match_id': id_,
+            'game_number': game_number,
+            'map': map_name,
+            'picked_by_left': picked,
+            'duration_seconds': duration_seconds(game['map'].get('duration')),
+            **partition
+        }
+        for team in ('team_left', 'team_right'):
+            overview = game[team]['team_overview']
+            game_row[f'{team}'] = clean(overview.get('name'))
+            game_row[f'{team}_score'] = to_number(overview.get('score'), int)
+            game_row[f'{team}_t_score'] = to_number(overview.get('t_side_score'), int)
+            game_row[f'{team}_ct_score'] = to_number(overview.get('ct_side_score'), int)
+
+            for player in game[team]['players'] or []:
+                player_row = {
+                    'match_id': id_,
+                    'game_number': game_number,
+                    'map': map_name,
+                    'team_side': team[len('team_'):],
+                    'team': clean(overview.get('name')),
+                    'player': clean(player.get('name')),
+                    'team_code': clean(player.get('team_code')),
+                    'country': clean(player.get('country')),
+                    'agent': clean(player.get('agent'))
+                }
+                for key, column, cast in PLAYER_STATS:
+                    stats = player.get(key) or {}
+                    for side, suffix in SIDES:
+                        player_row[column + suffix] = to_number(stats.get(side), cast)
+                player_row.update(partition)
+                player_rows.append(player_row)
+        game_rows.append(game_row)
+
+    return match_row, game_rows, player_rows
+
+def schemas():
+    import pyarrow as pa
+
+    partition_fields = [('event', pa.string()), ('month', pa.string())]
+    matches = pa.schema([
+        ('match_id', pa.int64()), ('url', pa.string()), ('team_1', pa.string()), ('team_2', pa.string()),
+        ('event_series', pa.string()), ('team_1_score', pa.int16()), ('team_2_score', pa.int16()),
+        ('stage', pa.string()), ('match_type', pa.string()), ('date', pa.date32()), ('time', pa.string()),
+        ('maps', pa.int8())
+    ] + partition_fields)
+    games = pa.schema([
+        ('match_id', pa.int64()), ('game_number', pa.int8()), ('map', pa.string()), ('picked_by_left', pa.bool_()),
+        ('duration_seconds', pa.int32())
+    ] + [
+        field for team in ('team_left', 'team_right') for field in [
+            (team, pa.string()), (f'{team}_score', pa.int16()), (f'{team}_t_score', pa.int16()), (f'{team}_ct_score', pa.int16())
+        ]
+    ] + partition_fields)
+    types = {int: pa.int16(), float: pa.float64()}
+    player_game_stats = pa.schema([
+        ('match_id', pa.int64()), ('game_number', pa.int8()), ('map', pa.string()), ('team_side', pa.string()),
+        ('team', pa.string()), ('player', pa.string()), ('team_code', pa.string()), ('country', pa.string()), ('agent', pa.string())
+    ] + [
+        (column + suffix, types[cast]) for _, column, cast in PLAYER_STATS for _, suffix in SIDES
+    ] + partition_fields)
+    return {'matches': matches, 'games': games, 'player_game_stats': player_game_stats}
+
+def read_matches(data_path: str) -> Iterator[dict]:
+    """
+    Yields the match records, skipping the ones superseded by a later record of the same match (refreshed matches).
+    """
+    index = MatchIndex.open(data_path)
+    with open(data_path, 'rb') as f:
+        offset = 0
+        for line in f:
+            start = offset
+            offset += len(line)
+            if not line.strip():
+                continue
+            match = json.loads(line)
+            id_ = match_id(match['url'])
+            if id_ is not None and index.offset(id_) != start:
+                continue
+            yield match
+
+def export(data_path: str, output_dir: str, partition_by: Optional[str] = 'month', batch_size: int = 1000) -> None:
+    """
+    Streams the NDJSON data file into three Parquet datasets under output_dir: matches, games and player_game_stats,
+    partitioned by event or month (hive-style directories, e.g. month=2022-06). The file is read once and each table
+    is written by its own pyarrow writer from a bounded queue of record batches, so memory stays flat.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    from tqdm import tqdm
+
+    tables = schemas()
+    queues = {name: queue.Queue(maxsize=4) for name in tables}
+    errors = []
+
+    def write(name: str):
+        schema = tables[name]
+
+        def batches():
+            while (batch := queues[name].get()) is not None:
+                yield batch
+
+        try:
+            ds.write_dataset(
+                batches(),
+                f'{output_dir}/{name}',
+                schema=schema,
+                format='parquet',
+                partitioning=[partition_by] if partition_by else None,
+                partitioning_flavor='hive' if partition_by else None,
+                existing_data_behavior='delete_matching',
+                max_open_files=256,
+                max_rows_per_group=1 << 17
+            )
+        except Exception as e:
+            errors.append(e)
+            # Keep draining so the reader never blocks on this queue
+            while queues[name].get() is not None:
+                pass
+
+    writers = [threading.Thread(target=write, args=(name,), name=f'write-{name}') for name in tables]
+    for writer in writers:
+        writer.start()
+
+    rows = {name: [] for name in tables}
+
+    def flush():
+        for name, schema in tables.items():
+            if rows[name]:
+                queues[name].put(pa.RecordBatch.from_pylist(rows[name], schema=schema))
+                rows[name] = []
+
+    try:
+        for match in tqdm(read_matches(data_path), desc='Exporting matches'):
+            match_row, game_rows, player_rows = flatten_match(match)
+            rows['matches'].append(match_row)
+            rows['games'] += game_rows
+            rows['player_game_stats'] += player_rows
+            if len(rows['matches']) >= batch_size:
+                flush()
+        flush()
+    finally:
+        for name in tables:
+            queues[name].put(None)
+        for writer in writers:
+            writer.join()
+
+    if errors:
+        raise errors[0]
+
+def main():
+    parser = argparse.ArgumentParser(description='Export scraped_data.json to typed Parquet tables: matches, games and player_game_stats')
+    parser.add_argument('--input', default='./data/scraped_data.json', help='NDJSON data file (default: ./data/scraped_data.json)')
+    parser.add_argument('--output', default='./data/parquet', help='Output directory (default: ./data/parquet)')
+    parser.add_argument('--partition-by', choices=['event', 'month', 'none'], default='month', help='Partition column (default: month)')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Matches per record batch (default: 1000)')
+    args = parser.parse_args()
+
+    export(args.input, args.output, None if args.partition_by == 'none' else args.partition_by, args.batch_size)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional
+from urllib.parse import urlsplit
+from .http_client import RETRY_STATUSES, TRANSIENT_ERRORS, HttpClient, Response, parse_retry_after
+from .metrics import metrics
+
+if TYPE_CHECKING:
+    from .html_cache import HtmlCache
+
+class TokenBucket:
+    """
+    Token bucket rate limiter: allows `rate` requests per second on average, with bursts of up to `burst` requests.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+class HostRateLimiter:
+    """
+    Keeps one token bucket per host, so every host gets its own requests/sec budget.
+    The rate adapts to the error rate over the last `window` requests to each host: when more than `max_error_rate`
+    of them failed the rate is halved, down to `min_rate`, and while requests succeed it climbs back up to `rate`.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, min_rate: Optional[float] = None, window: int = 20, max_error_rate: float = 0.2):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate or rate / 16
+        self.window = window
+        self.max_error_rate = max_error_rate
+        self.buckets = {}
+        self.results = {}
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate, self.burst)
+            self.results[host] = deque(maxlen=self.window)
+        return self.buckets[host]
+
+    async def acquire(self, url: str) -> None:
+        await self.bucket(url).acquire()
+
+    def pause(self, url: str, seconds: float) -> None:
+        """
+        Stops all requests to the URL's host for a while, e.g. for a Retry-After.
+        """
+        self.bucket(url).pause(seconds)
+
+    def record(self, url: str, ok: bool) -> None:
+        bucket = self.bucket(url)
+        results = self.results[urlsplit(url).netloc]
+        results.append(ok)
+
+        errors = results.count(False)
+        if not ok and errors >= 2 and errors / len(results) > self.max_error_rate:
+            # Start a new window, so one burst of errors halves the rate only once
+            results.clear()
+            if bucket.rate > self.min_rate:
+                bucket.rate = max(self.min_rate, bucket.rate / 2)
+                print(f'High error rate, slowing down to {bucket.rate:.2f} requests/sec')
+        elif ok and bucket.rate < self.rate:
+            # Additive increase: back to the full rate after about 20 successful windows
+            bucket.rate = min(self.rate, bucket.rate + self.rate / (20 * self.window))
+
+async def fetch(client: HttpClient, url: str, limiter: HostRateLimiter, headers: Optional[dict] = None) -> Optional[Response]:
+    """
+    Fetches a single URL, waiting for the host's rate limiter before every attempt.
+    Network errors and RETRY_STATUSES are retried with the client's backoff, a Retry-After pauses the whole host.
+    Returns the last response, None if every attempt failed without one.
+    Latency, status, bytes, retries and errors by type are recorded in the metrics registry.
+    """
+    loop = asyncio.get_running_loop()
+    response = None
+    for attempt in range(client.max_retries + 1):
+        await limiter.acquire(url)
+        start = time.monotonic()
+        try:
+            response = await loop.run_in_executor(None, client.fetch_once, url, headers)
+        except TRANSIENT_ERRORS as e:
+            response = None
+            error = str(e) or type(e).__name__
+            metrics.inc('fetch_errors_total', type=type(e).__name__)
+        else:
+            metrics.observe('request_seconds', time.monotonic() - start)
+            metrics.inc('responses_total', status=response.status)
+            metrics.inc('downloaded_bytes_total', len(response.body))
+            if response.status not in RETRY_STATUSES:
+                limiter.record(url, True)
+                return response
+            error = f'HTTP {response.status}'
+            metrics.inc('fetch_errors_total', type=error)
+
+        limiter.record(url, False)
+        if attempt == client.max_retries:
+            break
+        metrics.inc('retries_total')
+        delay = client.retry_delay(attempt, response)
+        if response is not None and parse_retry_after(response.headers.get('Retry-After')) is not None:
+            limiter.pause(url, delay)
+        print(f'Error occurred: {error}. Retrying in {delay:.1f}s ({attempt+1}/{client.max_retries})...')
+        await asyncio.sleep(delay)
+
+    print(f'Failed to scrape {url}')
+    metrics.inc('fetch_failures_total')
+    return response
+
+def _hand_over(results: queue.Queue, item: tuple, stop: threading.Event) -> None:
+    """
+    Puts the item on the results queue, blocking while it's full, unless the consumer has stopped listening.
+    """
+    while not stop.is_set():
+        try:
+            results.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+async def _run(urls: list[str], client: HttpClient, results: queue.Queue, stop: threading.Event, workers: int, rate: float, burst: int,
+               headers: Optional[Callable[[str], dict]]) -> None:
+    loop = asyncio.get_running_loop()
+    # Executor threads do the blocking I/O, one extra thread is used to hand results over to the consumer
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=workers + 1))
+
+    limiter = HostRateLimiter(rate, burst)
+    pending = asyncio.Queue()
+    for url in urls:
+        pending.put_nowait(url)
+
+    async def worker():
+        while not pending.empty() and not stop.is_set():
+            url = pending.get_nowait()
+            response = await fetch(client, url, limiter, headers(url) if headers else None)
+            # Blocks while the results queue is full, so fetchers never run far ahead of the consumer
+            await loop.run_in_executor(None, _hand_over, results, (url, response), stop)
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+
+_DONE = object()
+
+def fetch_responses(urls: Iterable[str], client: HttpClient, workers: int = 1, rate: float = 2.0, burst: int = 1,
+                    headers: Optional[Callable[[str], dict]] = None) -> Iterator[tuple[str, Optional[Response]]]:
+    """
+    Fetches the URLs concurrently on a background event loop and yields (url, response) in completion order,
+    the response is None if every attempt failed without one. `headers(url)` gives extra request headers for each URL.
+    At most `workers` requests are in flight and each host is limited to `rate` requests/sec with bursts of `burst`,
+    so throughput is set by the rate limit and not by round-trip latency. Parsing is left to the caller.
+    If the caller stops iterating early, the fetchers finish the requests in flight and don't start new ones.
+    """
+    urls = list(urls)
+    results = queue.Queue(maxsize=workers * 2)
+    stop = threading.Event()
+
+    def run_loop():
+        try:
+            asyncio.run(_run(urls, client, results, stop, workers, rate, burst, headers))
+        except BaseException as e:
+            _hand_over(results, (_DONE, e), stop)
+        else:
+            _hand_over(results, (_DONE, None), stop)
+
+    thread = threading.Thread(target=run_loop, name='fetcher', daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = results.get()
+            if item[0] is _DONE:
+                thread.join()
+                if item[1] is not None:
+                    raise item[1]
+                return
+            yield item
+    finally:
+        stop.set()
+
+def fetch_all(urls: Iterable[str], client: HttpClient, workers: int = 1, rate: float = 2.0, burst: int = 1,
+              cache: Optional['HtmlCache'] = None) -> Iterator[tuple[str, Optional[int], Optional[bytes]]]:
+    """
+    Like fetch_responses, but yields (url, status, content): content is None if the status isn't 200,
+    and both are None if every attempt failed without a response.
+    Responses are stored in `cache` if given, with their ETag and Last-Modified for later conditional requests.
+    """
+    for url, response in fetch_responses(urls, client, workers, rate, burst):
+        if response is None:
+            yield url, None, None
+            continue
+        content = response.body if response.status == 200 else None
+        if cache is not None:
+            cache.put(url, response.status, content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        yield url, response.status, content
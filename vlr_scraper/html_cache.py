@@ -0,0 +1,199 @@
+import gzip
+import hashlib
+import importlib.util
+import os
+import sqlite3
+import time
+from typing import Iterator, Optional
+
+# Compression used for new blobs, entries keep the codec they were written with so both can be read back.
+# zstandard is only looked up here and imported when a blob is compressed or decompressed.
+DEFAULT_CODEC = 'zstd' if importlib.util.find_spec('zstandard') else 'gzip'
+
+def compress(content: bytes, codec: str) -> bytes:
+    if codec == 'zstd':
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=10).compress(content)
+    return gzip.compress(content, compresslevel=6)
+
+def decompress(blob: bytes, codec: str) -> bytes:
+    if codec == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError('The cache contains zstd blobs, install zstandard to read them')
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return gzip.decompress(blob)
+
+def url_key(url: str) -> str:
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+class HtmlCache:
+    """
+    On-disk cache of fetched pages. Each page is stored compressed in blobs/<key[:2]>/<key>, where the key is the
+    SHA-256 of its URL, and index.sqlite keeps the URL, HTTP status, fetch time, last access time and blob size.
+    When the blobs grow over `max_bytes` the least recently used ones are evicted, and entries older than
+    `max_age` seconds are evicted on open.
+    """
+
+    def __init__(self, directory: str, max_bytes: Optional[int] = None, max_age: Optional[float] = None, codec: str = DEFAULT_CODEC):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.codec = codec
+        os.makedirs(os.path.join(directory, 'blobs'), exist_ok=True)
+
+        self.db = sqlite3.connect(os.path.join(directory, 'index.sqlite'))
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                key TEXT NOT NULL,
+                status INTEGER,
+                codec TEXT,
+                size INTEGER NOT NULL DEFAULT 0,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        ''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)')
+        # Validators for conditional re-fetches, added after the first version of the index
+        columns = {row[1] for row in self.db.execute('PRAGMA table_info(pages)')}
+        for column in ('etag', 'last_modified', 'stats_hash'):
+            if column not in columns:
+                self.db.execute(f'ALTER TABLE pages ADD COLUMN {column} TEXT')
+        self.db.commit()
+
+        if max_age is not None:
+            self.evict_older_than(time.time() - max_age)
+        self.total_bytes = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+
+    def blob_path(self, key: str) -> str:
+        return os.path.join(self.directory, 'blobs', key[:2], key)
+
+    def put(self, url: str, status: Optional[int], content: Optional[bytes], etag: Optional[str] = None,
+            last_modified: Optional[str] = None, stats_hash: Optional[str] = None) -> None:
+        """
+        Stores a fetched page with its validators. Pages without content (non-200 responses) only get an index entry with their status,
+        unless the URL already has a cached page: a failed re-fetch keeps the good copy and its blob.
+        """
+        previous = self.db.execute('SELECT size FROM pages WHERE url = ?', (url,)).fetchone()
+        if content is None and previous and previous[0] > 0:
+            return
+
+        key = url_key(url)
+        size = 0
+        if content is not None:
+            blob = compress(content, self.codec)
+            path = self.blob_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so a crash never leaves a truncated blob behind
+            with open(path + '.tmp', 'wb') as f:
+                f.write(blob)
+            os.replace(path + '.tmp', path)
+            size = len(blob)
+
+        now = time.time()
+        self.db.execute(
+            'INSERT OR REPLACE INTO pages (url, key, status, codec, size, fetched_at, accessed_at, etag, last_modified, stats_hash) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (url, key, status, self.codec if content is not None else None, size, now, now, etag, last_modified, stats_hash)
+        )
+        self.db.commit()
+        self.total_bytes += size - (previous[0] if previous else 0)
+
+        if self.max_bytes is not None and self.total_bytes > self.max_bytes:
+            self.evict_lru()
+
+    def validators(self, url: str) -> dict:
+        """
+        ETag, Last-Modified and stats hash stored for the URL, missing values are None.
+        """
+        row = self.db.execute('SELECT etag, last_modified, stats_hash FROM pages WHERE url = ?', (url,)).fetchone()
+        return dict(zip(('etag', 'last_modified', 'stats_hash'), row or (None, None, None)))
+
+    def set_validators(self, url: str, etag: Optional[str], last_modified: Optional[str], stats_hash: Optional[str]) -> None:
+        """
+        Replaces the validators and stats hash of a cached page, once the record parsed from it is committed.
+        """
+        self.db.execute('UPDATE pages SET etag = ?, last_modified = ?, stats_hash = ? WHERE url = ?', (etag, last_modified, stats_hash, url))
+        self.db.commit()
+
+    def touch(self, url: str) -> None:
+        """
+        Marks the cached page as fetched now, for a 304 Not Modified.
+        """
+        now = time.time()
+        self.db.execute('UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE url = ?', (now, now, url))
+        self.db.commit()
+
+    def get(self, url: str) -> Optional[bytes]:
+        """
+        Returns the cached page content, None if it isn't cached or wasn't a 200 response.
+        """
+        row = self.db.execute('SELECT key, codec FROM pages WHERE url = ? AND size > 0', (url,)).fetchone()
+        if row is None:
+            return None
+        try:
+            with open(self.blob_path(row[0]), 'rb') as f:
+                content = decompress(f.read(), row[1])
+        except FileNotFoundError:
+            return None
+        self.db.execute('UPDATE pages SET accessed_at = ? WHERE url = ?', (time.time(), url))
+        self.db.commit()
+        return content
+
+    def entries(self, status: Optional[int] = 200) -> Iterator[tuple[str, str, str]]:
+        """
+        Yields (url, blob path, codec) for every cached page with the given status.
+        """
+        rows = self.db.execute('SELECT url, key, codec FROM pages WHERE status = ? AND size > 0 ORDER BY fetched_at', (status,)).fetchall()
+        for url, key, codec in rows:
+            yield url, self.blob_path(key), codec
+
+    def _delete(self, rows: list[tuple[str, str, int]]) -> None:
+        for url, key, size in rows:
+            try:
+                os.remove(self.blob_path(key))
+            except FileNotFoundError:
+                pass
+            self.total_bytes -= size
+        self.db.executemany('DELETE FROM pages WHERE url = ?', [(row[0],) for row in rows])
+        self.db.commit()
+
+    def evict_lru(self) -> None:
+        """
+        Evicts the least recently used pages until the cache is 10% under its size limit,
+        so eviction doesn't run again on every put.
+        """
+        target = self.max_bytes * 0.9
+        rows = []
+        freed = 0
+        for url, key, size in self.db.execute('SELECT url, key, size FROM pages WHERE size > 0 ORDER BY accessed_at'):
+            if self.total_bytes - freed <= target:
+                break
+            rows.append((url, key, size))
+            freed += size
+        self._delete(rows)
+
+    def evict_older_than(self, timestamp: float) -> None:
+        rows = self.db.execute('SELECT url, key, size FROM pages WHERE fetched_at < ?', (timestamp,)).fetchall()
+        self._delete(rows)
+
+    def close(self) -> None:
+        self.db.close()
+
+def read_cached_page(path: str, codec: str) -> bytes:
+    with open(path, 'rb') as f:
+        return decompress(f.read(), codec)
+
+def cached_pages(cache: HtmlCache) -> Iterator[tuple[str, int, bytes]]:
+    """
+    Yields (url, status, content) for every cached 200 page, without any network I/O.
+    """
+    for url, path, codec in cache.entries():
+        try:
+            yield url, 200, read_cached_page(path, codec)
+        except FileNotFoundError:
+            continue
@@ -0,0 +1,532 @@
+from __future__ import annotations
+
+import json
+import os
+from functools import partial
+from typing import TYPE_CHECKING, Optional
+from .parsers import PARSER_BACKENDS, make_soup
+from .metrics import section, timed
+
+# Only the parsing code is imported up front, so parser processes and library users that only parse pages
+# start quickly. The networking, pipeline and cache modules are imported by the functions that use them.
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+    from .html_cache import HtmlCache
+    from .http_client import HttpClient
+
+def extract_overview(team_div: BeautifulSoup) -> dict:
+    """
+    Extracts the game overview from the team div (game and match are used interchangeably here).
+    """
+
+    # Extract the team's score
+    team_score_div = team_div.find('div', class_='score')
+    team_score = team_score_div.text.strip() if team_score_div else None
+
+    # Extract the team's name
+    team_name_div = team_div.find('div', class_='team-name')
+    team_name = team_name_div.text.strip() if team_name_div else None
+
+    # Extract the T-side and CT-side rounds won
+    t_side_score_div = team_div.find('span', class_='mod-t')
+    t_side_score = t_side_score_div.text.strip() if t_side_score_div else None
+
+    ct_side_score_div = team_div.find('span', class_='mod-ct')
+    ct_side_score = ct_side_score_div.text.strip() if ct_side_score_div else None
+
+    team_overview = {
+        'name': team_name,
+        'score': team_score,
+        't_side_score': t_side_score,
+        'ct_side_score': ct_side_score
+    }
+
+    return team_overview
+
+# Stat columns of the players table, in the order they are stored in player_data.
+# Columns are found by the class of their td, or by their index when several tds share the same classes.
+PLAYER_STAT_COLUMNS = [
+    ('r_stats', 2),
+    ('acs_stats', 3),
+    ('kill_stats', 'mod-vlr-kills'),
+    ('death_stats', 'mod-vlr-deaths'),
+    ('assist_stats', 'mod-vlr-assists'),
+    ('kd_diff_stats', 'mod-kd-diff'),
+    ('kast_stats', 8),
+    ('adr_stats', 9),
+    ('headshot_stats', 10),
+    ('fk_stats', 11),
+    ('fd_stats', 12),
+    ('fk_diff_stats', 13)
+]
+
+PLAYER_COLUMN_CLASSES = ['mod-player', 'mod-agents'] + [column for _, column in PLAYER_STAT_COLUMNS if isinstance(column, str)]
+
+def find_first(tag: BeautifulSoup, wanted: list[tuple[str, Optional[str]]]) -> dict:
+    """
+    Finds the first descendant of the tag matching each (tag name, class) pair in a single walk of its subtree.
+    Same matches as calling tag.find(name, class_=class) for each pair, missing pairs are left out of the result.
+    """
+    found = {}
+    for element in tag.descendants:
+        if element.name is None:
+            continue
+        classes = element.get('class') or ()
+        for name, class_ in wanted:
+            if element.name == name and (class_ is None or class_ in classes) and (name, class_) not in found:
+                found[(name, class_)] = element
+        if len(found) == len(wanted):
+            break
+    return found
+
+def extract_side_stats(stats_row: BeautifulSoup) -> Optional[dict]:
+    """
+    Extracts the combined, T-side and CT-side values from a stat column, None if it has no stats.
+    """
+    stats_div = find_first(stats_row, [('span', 'stats-sq')]).get(('span', 'stats-sq'))
+    if not stats_div:
+        return None
+
+    sides = find_first(stats_div, [('span', 'mod-both'), ('span', 'mod-t'), ('span', 'mod-ct')])
+    return {
+        side: sides[('span', class_)].text.strip() if ('span', class_) in sides else None
+        for side, class_ in (('both', 'mod-both'), ('t', 'mod-t'), ('ct', 'mod-ct'))
+    }
+
+@timed('extract_player_info')
+def extract_player_info(table: BeautifulSoup) -> list[dict]:
+    """
+    Extracts each player's stats from the players table.
+    It is called for each player table (two per game, one for each team).
+    Each row's tds are collected once and the columns are read following PLAYER_STAT_COLUMNS.
+    """
+
+    player_info = []
+
+    tbody = table.find('tbody')
+    rows = tbody.find_all('tr') if tbody else []
+
+    # Iterate over each row
+    for row in rows:
+        # Extract player data
+        player_data = {}
+
+        tds = row.find_all('td')
+        # First td with each class, like row.find('td', class_=...)
+        tds_by_class = {}
+        for td in tds:
+            for class_ in td.get('class') or ():
+                if class_ in PLAYER_COLUMN_CLASSES and class_ not in tds_by_class:
+                    tds_by_class[class_] = td
+
+        player_details_row = tds_by_class.get('mod-player')
+        if player_details_row:
+            details = find_first(player_details_row, [('div', 'text-of'), ('div', 'ge-text-light'), ('i', 'flag')])
+
+            name_div = details.get(('div', 'text-of'))
+            player_data['name'] = name_div.text.strip() if name_div else None
+
+            team_code_div = details.get(('div', 'ge-text-light'))
+            player_data['team_code'] = team_code_div.text.strip() if team_code_div else None
+
+            country_div = details.get(('i', 'flag'))
+            player_data['country'] = country_div.get('title') if country_div else None
+
+        agent_row = tds_by_class.get('mod-agents')
+        # Extract the agent's name
+        if agent_row:
+            agent_img = find_first(agent_row, [('img', None)]).get(('img', None))
+            player_data['agent'] = agent_img.get('title') if agent_img else None
+
+        for stat_name, column in PLAYER_STAT_COLUMNS:
+            # Index columns assume the table layout never changes - some tds have the same class
+            stats_row = tds[column] if isinstance(column, int) else tds_by_class.get(column)
+            if stats_row:
+                stats = extract_side_stats(stats_row)
+                if stats is not None:
+                    player_data[stat_name] = stats
+
+        player_info.append(player_data)
+
+    return player_info
+
+@timed('scrape_game')
+def scrape_game(game_div: BeautifulSoup) -> dict:
+    """
+    Scrapes the game details from the game div, calls extract_overview and extract_player_info.
+    """
+    # Check if the div is for a specific game (skipping the match overview div)
+    if not game_div.find('div', class_='vm-stats-game-header'):
+        return None
+
+    # Find the team_left_div and team_right_div
+    team_divs = game_div.find_all('div', class_='team')
+    team_left_div, team_right_div = team_divs[0], team_divs[1] if team_divs else (None, None)
+
+    # Extract the game overview
+    team_left_overview = extract_overview(team_left_div)
+    team_right_overview = extract_overview(team_right_div)
+
+    # Extract the map name and game duration
+    map_div = game_div.find('div', class_='map')
+    map_name_span = map_div.find('span')
+    map_name = map_name_span.text.strip() if map_name_span else None
+
+    game_duration_div = map_div.find('div', class_='map-duration')
+    game_duration = game_duration_div.text.strip() if game_duration_div else None
+
+    # Extract player info
+    player_tables = game_div.find_all('table', class_='wf-table-inset')
+    if len(player_tables) >= 2:
+        team_left_players = extract_player_info(player_tables[0])
+        team_right_players = extract_player_info(player_tables[1])
+    else:
+        team_left_players = None
+        team_right_players = None
+
+    game_data = {
+        'map': {
+            'name': map_name,
+            'duration': game_duration
+        },
+        'team_left': {
+            'team_overview': team_left_overview,
+            'players': team_left_players
+        },
+        'team_right': {
+            'team_overview': team_right_overview,
+            'players': team_right_players
+        }
+    }
+
+    return game_data
+
+# Header divs scan_header keeps the first of, by class
+HEADER_CONTAINERS = {
+    'match-header-super': 'super',
+    'match-header-vs': 'vs',
+    'match-header-vs-score': 'score',
+    'match-header-date': 'date'
+}
+
+def scan_header(header: BeautifulSoup) -> dict:
+    """
+    Collects the match header elements in a single walk of the header subtree, the same elements the whole-document
+    soup.find calls found: the event link in the first match-header-super, the team names in the first match-header-vs,
+    the spoiler of the first match-header-vs-score, the first two match-header-vs-note divs (stage and match type)
+    and the timestamp in the first match-header-date. Missing elements are None.
+    """
+    found = {'super': None, 'event': None, 'vs': None, 'team_names': [], 'score': None, 'spoiler': None,
+             'notes': [], 'date': None, 'date_time': None}
+    # Pre-order walk in document order, each tag comes with the header containers it's inside
+    stack = [(header, ())]
+    while stack:
+        tag, inside = stack.pop()
+        if tag.name == 'div' or tag.name == 'a':
+            for class_ in tag.get('class') or ():
+                if tag.name == 'a':
+                    if class_ == 'match-header-event' and 'super' in inside and found['event'] is None:
+                        found['event'] = tag
+                elif class_ in HEADER_CONTAINERS:
+                    key = HEADER_CONTAINERS[class_]
+                    if found[key] is None:
+                        found[key] = tag
+                        inside += (key,)
+                elif class_ == 'match-header-vs-note':
+                    if len(found['notes']) < 2:
+                        found['notes'].append(tag)
+                elif class_ == 'wf-title-med':
+                    if 'vs' in inside:
+                        found['team_names'].append(tag)
+                elif class_ == 'js-spoiler':
+                    if 'score' in inside and found['spoiler'] is None:
+                        found['spoiler'] = tag
+                elif class_ == 'moment-tz-convert':
+                    if 'date' in inside and found['date_time'] is None:
+                        found['date_time'] = tag
+        stack.extend((child, inside) for child in reversed(list(tag.children)) if child.name is not None)
+    return found
+
+def scrape_match(url: str, backend: str = 'html.parser', client: Optional[HttpClient] = None) -> dict:
+    """
+    Main function to scrape match details, fetches the page and calls parse_match.
+    The client (the shared one from .env by default) retries network errors and rate limiting with backoff.
+    """
+
+    from .http_client import default_client
+
+    response = (client or default_client()).get(url)
+    if response is None or response.status != 200:
+        return None
+
+    return parse_match(response.body, url, backend)
+
+def parse_match(content: bytes, url: str, backend: str = 'html.parser') -> dict:
+    """
+    Parses the match page HTML into the match dict with the chosen parser backend, calls extract_match.
+    Does no network I/O, so it can run separately from fetching.
+    """
+
+    with section('soup'):
+        soup = make_soup(content, backend)
+    return extract_match(soup, url)
+
+# Header time is the rest of extract_match: the match header fields and walking the game divs
+@timed('header')
+def extract_match(soup: BeautifulSoup, url: str) -> dict:
+    """
+    Extracts the match dict from the parsed page, calls scan_header and scrape_game.
+    """
+
+    # Basic data, from a single walk of the header
+    header = scan_header(soup.find('div', class_='match-header') or soup)
+
+    event_a = header['event']
+    inner_div = event_a.find('div') if event_a else None
+    event_divs = inner_div.find_all('div') if inner_div else None
+    event_name = event_divs[0].text.strip().replace('\n', '').replace('\t', '') if event_divs and len(event_divs) > 0 else ''
+    event_series = event_divs[1].text.strip().replace('\n', '').replace('\t', '') if event_divs and len(event_divs) > 1 else ''
+
+    team_names = [div.text.strip() for div in header['team_names']] if header['vs'] else [None, None]
+
+    spoiler_div = header['spoiler']
+    score_elements = spoiler_div.find_all('span') if spoiler_div else None
+    if score_elements:
+        team_1_score = score_elements[0].text.strip()
+        team_2_score = score_elements[-1].text.strip()
+    else:
+        team_1_score = team_2_score = ''
+
+    notes = header['notes']
+    stage = notes[0].text.strip().replace('\n', '').replace('\t', '') if notes else None # Stage, e.g. Final, Semi-final, etc.
+    match_type = notes[1].text.strip() if len(notes) > 1 else None # Match type, e.g. Best of 3, Best of 5, etc.
+
+    date_time_div = header['date_time']
+    date_time = date_time_div.get('data-utc-ts').strip() if date_time_div else None
+    if date_time:
+        date, match_time = date_time.split(' ')
+    else:
+        date = match_time = None
+
+    # Map-specific details, each game div is scraped once
+    stats_container_div = soup.find('div', class_='vm-stats-container')
+    game_divs = stats_container_div.find_all('div', class_='vm-stats-game')
+    game_data = [game for game in map(scrape_game, game_divs) if game is not None]
+
+    match_data = {
+        'team_1': team_names[0],
+        'team_2': team_names[1],
+        'event': event_name,
+        'event_series': event_series,
+        'team_1_score': team_1_score,
+        'team_2_score': team_2_score,
+        'stage': stage,
+        'match_type': match_type,
+        'date': date,
+        'time': match_time,
+        'games': game_data,
+        'url': url
+    }
+
+    return match_data
+
+def carry_over_uncached(data_path: str, rebuilt_data_path: str, rebuilt_log_path: str) -> int:
+    """
+    Appends the current record of every match in `data_path` that the rebuild didn't produce to the rebuilt files:
+    matches scraped before the cache existed, pages evicted from it and cached pages that no longer parse.
+    Returns the number of records carried over.
+    """
+    from .match_index import MatchIndex, match_id
+    from .ndjson_writer import NdjsonWriter
+
+    if not os.path.exists(data_path):
+        return 0
+    index = MatchIndex.open(data_path)
+    rebuilt = MatchIndex.open(rebuilt_data_path)
+    carried = 0
+    writer = NdjsonWriter(rebuilt_data_path, rebuilt_log_path, flush_every=1000)
+    try:
+        with open(data_path, 'rb') as f:
+            offset = 0
+            for line in f:
+                start = offset
+                offset += len(line)
+                # A partly written last line was never committed
+                if not line.endswith(b'\n') or not line.strip():
+                    continue
+                record = json.loads(line)
+                id_ = match_id(record['url'])
+                if id_ is not None and (index.offset(id_) != start or id_ in rebuilt):
+                    continue
+                writer.write(record)
+                carried += 1
+    finally:
+        writer.close()
+    return carried
+
+def reparse_from_cache(cache: HtmlCache, backend: str, **pipeline_options) -> None:
+    """
+    Rebuilds scraped_data.json and scraped_urls.log from the cached pages, without any network I/O.
+    Matches without a cached page keep their current record, so nothing has to be scraped again.
+    The new files are written next to the old ones and only replace them once every page has been parsed.
+    `pipeline_options` are passed on to run_pipeline.
+    """
+    from .html_cache import cached_pages
+    from .pipeline import run_pipeline
+
+    for path in ('./data/scraped_data.json.tmp', './data/scraped_urls.log.tmp', './data/scraped_data.json.tmp.idx'):
+        # Left over from an interrupted rebuild
+        if os.path.exists(path):
+            os.remove(path)
+
+    total = sum(1 for _ in cache.entries())
+    run_pipeline(
+        cached_pages(cache),
+        partial(parse_match, backend=backend),
+        './data/scraped_data.json.tmp',
+        './data/scraped_urls.log.tmp',
+        total=total,
+        **pipeline_options
+    )
+    for path in ('./data/scraped_data.json', './data/scraped_urls.log'):
+        # The pipeline only creates the files once it has something to write
+        open(path + '.tmp', 'a').close()
+
+    carried = carry_over_uncached('./data/scraped_data.json', './data/scraped_data.json.tmp', './data/scraped_urls.log.tmp')
+    if carried:
+        print(f'Kept the current record of {carried} matches without a cached page')
+    if os.path.exists('./data/scraped_data.json.tmp.idx'):
+        os.remove('./data/scraped_data.json.tmp.idx')
+    for path in ('./data/scraped_data.json', './data/scraped_urls.log'):
+        os.replace(path + '.tmp', path)
+
+def add_scrape_arguments(parser, output_dir: str = './data') -> None:
+    """
+    Adds the fetch, parser, cache, flush and metrics options shared by get_match_details.py and the distributed workers.
+    `output_dir` is where the stats and the profile go by default, as shown in the help.
+    """
+    parser.add_argument('--workers', type=int, default=1, help='Number of concurrent requests (default: 1)')
+    parser.add_argument('--rate', type=float, default=2.0, help='Maximum requests per second per host (default: 2.0)')
+    parser.add_argument('--burst', type=int, default=1, help='Number of requests allowed in a burst above the rate (default: 1)')
+    parser.add_argument('--parse-workers', type=int, default=None, help='Number of parser processes (default: number of CPUs)')
+    parser.add_argument('--report-interval', type=float, default=30.0, help='Seconds between per-stage throughput reports (default: 30)')
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default='html.parser', help='HTML parser backend (default: html.parser)')
+    parser.add_argument('--cache-dir', default='./data/html_cache', help='Directory of the raw HTML cache (default: ./data/html_cache)')
+    parser.add_argument('--no-cache', action='store_true', help="Don't store fetched pages in the cache")
+    parser.add_argument('--cache-size-gb', type=float, default=10.0, help='Cache size limit, least recently used pages are evicted above it (default: 10)')
+    parser.add_argument('--cache-max-age-days', type=float, default=None, help='Evict cached pages fetched more than this many days ago (default: never)')
+    parser.add_argument('--flush-every', type=int, default=100, help='Commit the output every this many matches (default: 100)')
+    parser.add_argument('--flush-interval', type=float, default=5.0, help='Commit the output at least every this many seconds (default: 5)')
+    parser.add_argument('--stats-file', default=None, help=f'Append a JSON stats line here every report interval (default: {output_dir}/scrape_stats.jsonl)')
+    parser.add_argument('--prometheus-file', default=None, help='Write the metrics to this file in the Prometheus text format every report interval')
+    parser.add_argument('--profile', type=int, nargs='?', const=20, default=None, metavar='N',
+                        help=f'Parse one in every N pages (default: 20) under cProfile and save the stats to {output_dir}/profile.pstats')
+
+def run_pipeline_options(args, output_dir: str) -> dict:
+    """
+    run_pipeline keyword arguments from the options of add_scrape_arguments.
+    """
+    return dict(
+        parse_workers=args.parse_workers,
+        report_interval=args.report_interval,
+        flush_every=args.flush_every,
+        flush_interval=args.flush_interval,
+        stats_path=args.stats_file or os.path.join(output_dir, 'scrape_stats.jsonl'),
+        prometheus_path=args.prometheus_file,
+        profile_every=args.profile,
+        profile_path=os.path.join(output_dir, 'profile.pstats')
+    )
+
+def open_cache(args) -> HtmlCache:
+    """
+    The HTML cache with the size and age limits of the options of add_scrape_arguments.
+    """
+    from .html_cache import HtmlCache
+
+    return HtmlCache(
+        args.cache_dir,
+        max_bytes=int(args.cache_size_gb * 1024 ** 3),
+        max_age=args.cache_max_age_days * 86400 if args.cache_max_age_days is not None else None
+    )
+
+def main():
+    import argparse
+    from .fetcher import fetch_all
+    from .http_client import default_client
+    from .match_index import MatchIndex, match_id
+    from .ndjson_writer import recover_ndjson
+    from .pipeline import run_pipeline
+    from .refresh import recent_matches, refresh_pages, save_refreshed
+
+    parser = argparse.ArgumentParser(description='Scrape match details for the URLs in ./data/match_urls.json')
+    add_scrape_arguments(parser)
+    parser.add_argument('--reparse-from-cache', action='store_true', help='Rebuild scraped_data.json from the cache instead of scraping')
+    parser.add_argument('--refresh-days', type=float, default=None, help='Re-fetch the matches played in the last this many days and rewrite the changed ones')
+    args = parser.parse_args()
+
+    if args.refresh_days is not None and args.no_cache:
+        parser.error('--refresh-days needs the cache to detect changes, it can\'t be used with --no-cache')
+
+    pipeline_options = run_pipeline_options(args, './data')
+    cache = open_cache(args) if not args.no_cache or args.reparse_from_cache else None
+
+    if args.reparse_from_cache:
+        reparse_from_cache(cache, args.parser, **pipeline_options)
+        cache.close()
+        return
+
+    # Repair the data file and the log if the previous run was interrupted
+    recover_ndjson('./data/scraped_data.json', './data/scraped_urls.log')
+
+    # Matches that have already been scraped, by match ID
+    index = MatchIndex.open('./data/scraped_data.json')
+
+    if args.refresh_days is not None:
+        # Changed matches are appended again, the index and the Parquet export use the last record of each match
+        urls = recent_matches(index, args.refresh_days)
+        offsets = {id_: index.offset(id_) for id_ in map(match_id, urls)}
+        updates = {}
+        pages = refresh_pages(urls, default_client(), cache, workers=args.workers, rate=args.rate, burst=args.burst, updates=updates)
+        try:
+            run_pipeline(
+                pages,
+                partial(parse_match, backend=args.parser),
+                './data/scraped_data.json',
+                './data/scraped_urls.log',
+                **pipeline_options
+            )
+        finally:
+            # Only the pages whose new record made it to the data file are marked as up to date
+            save_refreshed(cache, index, updates, offsets)
+            cache.close()
+        return
+
+    # Get the URLs that haven't been scraped yet
+    with open('./data/match_urls.json', 'r') as f:
+        urls = json.load(f)
+    urls_to_scrape = []
+    queued = set()
+    for url in urls:
+        id_ = match_id(url)
+        if id_ in index or id_ in queued:
+            continue
+        if id_ is not None:
+            queued.add(id_)
+        urls_to_scrape.append(url)
+    del urls, queued
+
+    pages = fetch_all(urls_to_scrape, default_client(), workers=args.workers, rate=args.rate, burst=args.burst, cache=cache)
+    run_pipeline(
+        pages,
+        partial(parse_match, backend=args.parser),
+        './data/scraped_data.json',
+        './data/scraped_urls.log',
+        total=len(urls_to_scrape),
+        **pipeline_options
+    )
+    if cache:
+        cache.close()
+
+# Parser worker processes import this module, so the scrape only runs when it's executed as a script
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+import json
+import os
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Optional
+from urllib.parse import urlsplit
+
+MATCH_ID_PATTERN = re.compile(r'^/(\d+)(?:/|$)')
+
+# Index file layout: header, then the sorted match IDs, then the byte offset of each one's record
+INDEX_MAGIC = b'VLRIDX1\0'
+INDEX_HEADER = struct.Struct('<8sqqq')  # magic, data file inode, data file size covered, number of entries
+
+def match_id(url: str) -> Optional[int]:
+    """
+    Numeric match ID from a match URL, e.g. 106455 for https://www.vlr.gg/106455/paper-rex-vs-order-...
+    """
+    found = MATCH_ID_PATTERN.match(urlsplit(url).path)
+    return int(found.group(1)) if found else None
+
+class MatchIndex:
+    """
+    Compact index of the NDJSON data file: a sorted array of match IDs and the byte offset of each match's record.
+    Takes 16 bytes per match, answers "already scraped?" with a binary search and reads single matches without scanning the file.
+    The index is saved next to the data file (<data file>.idx) and only the records appended since it was saved
+    are scanned when it's opened. If a match appears more than once, the last record wins.
+    """
+
+    def __init__(self, data_path: str, index_path: Optional[str] = None):
+        self.data_path = data_path
+        self.index_path = index_path or data_path + '.idx'
+        self.ids = array('q')
+        self.offsets = array('q')
+        self.inode = 0
+        self.covered = 0
+
+    @classmethod
+    def open(cls, data_path: str, index_path: Optional[str] = None) -> 'MatchIndex':
+        index = cls(data_path, index_path)
+        index.load()
+        if index.refresh():
+            index.save()
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, id_: Optional[int]) -> bool:
+        return id_ is not None and self.offset(id_) is not None
+
+    def offset(self, id_: int) -> Optional[int]:
+        i = bisect_left(self.ids, id_)
+        if i < len(self.ids) and self.ids[i] == id_:
+            return self.offsets[i]
+        return None
+
+    def read_match(self, id_: int) -> Optional[dict]:
+        """
+        Reads a single match record from the data file by its match ID.
+        """
+        offset = self.offset(id_)
+        if offset is None:
+            return None
+        with open(self.data_path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def load(self) -> None:
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, 'rb') as f:
+            header = f.read(INDEX_HEADER.size)
+            if len(header) < INDEX_HEADER.size:
+                return
+            magic, inode, covered, count = INDEX_HEADER.unpack(header)
+            if magic != INDEX_MAGIC:
+                return
+            ids = array('q')
+            offsets = array('q')
+            try:
+                ids.fromfile(f, count)
+                offsets.fromfile(f, count)
+            except EOFError:
+                return
+        self.ids, self.offsets, self.inode, self.covered = ids, offsets, inode, covered
+
+    def save(self) -> None:
+        with open(self.index_path + '.tmp', 'wb') as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, self.inode, self.covered, len(self.ids)))
+            self.ids.tofile(f)
+            self.offsets.tofile(f)
+        os.replace(self.index_path + '.tmp', self.index_path)
+
+    def refresh(self) -> bool:
+        """
+        Indexes the records appended to the data file since the index was last saved.
+        The index is rebuilt from scratch if the data file was replaced or truncated. Returns whether anything changed.
+        """
+        if not os.path.exists(self.data_path):
+            changed = len(self.ids) > 0
+            self.ids, self.offsets, self.inode, self.covered = array('q'), array('q'), 0, 0
+            return changed
+
+        stat = os.stat(self.data_path)
+        if stat.st_ino != self.inode or stat.st_size < self.covered:
+            self.ids, self.offsets, self.inode, self.covered = array('q'), array('q'), stat.st_ino, 0
+        if stat.st_size == self.covered:
+            return False
+
+        new_entries = {}
+        with open(self.data_path, 'rb') as f:
+            f.seek(self.covered)
+            offset = self.covered
+            for line in f:
+                # A partly written last line is picked up once it's complete
+                if not line.endswith(b'\n'):
+                    break
+                id_ = match_id(json.loads(line)['url'])
+                if id_ is not None:
+                    new_entries[id_] = offset
+                offset += len(line)
+        self.covered = offset
+        self.merge(new_entries)
+        return True
+
+    def merge(self, new_entries: dict[int, int]) -> None:
+        """
+        Merges {match ID: offset} into the sorted arrays, new offsets replace existing ones.
+        """
+        if not new_entries:
+            return
+        ids = array('q')
+        offsets = array('q')
+        new_ids = sorted(new_entries)
+        i = j = 0
+        while i < len(self.ids) or j < len(new_ids):
+            if j == len(new_ids) or (i < len(self.ids) and self.ids[i] < new_ids[j]):
+                ids.append(self.ids[i])
+                offsets.append(self.offsets[i])
+                i += 1
+            else:
+                if i < len(self.ids) and self.ids[i] == new_ids[j]:
+                    i += 1
+                ids.append(new_ids[j])
+                offsets.append(new_entries[new_ids[j]])
+                j += 1
+        self.ids, self.offsets = ids, offsets
+
+def main():
+    # Print a single match by ID: python match_index.py <match id> [data file]
+    if len(sys.argv) < 2:
+        sys.exit('Usage: python match_index.py <match id> [data file]')
+    data_path = sys.argv[2] if len(sys.argv) > 2 else './data/scraped_data.json'
+    match = MatchIndex.open(data_path).read_match(int(sys.argv[1]))
+    if match is None:
+        sys.exit(f'Match {sys.argv[1]} not found in {data_path}')
+    print(json.dumps(match, indent=4))
+
+if __name__ == '__main__':
+    main()
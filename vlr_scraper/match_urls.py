@@ -0,0 +1,193 @@
+import argparse
+from typing import Optional
+import time
+import json
+import os
+from .parsers import PARSER_BACKENDS, make_soup
+from .metrics import metrics
+from .http_client import HttpClient, default_client
+
+RESULTS_URL = 'https://www.vlr.gg/matches/results?page={page}'
+
+def parse_last_page(content: bytes, backend: str = 'html.parser') -> Optional[int]:
+    soup = make_soup(content, backend)
+
+    action_container = soup.find('div', class_='action-container')
+    if action_container:
+        pages_div = action_container.find('div', class_='action-container-pages')
+        if pages_div:
+            page_links = pages_div.find_all('a', class_='btn mod-page')
+            if page_links:
+                return int(page_links[-1].text.strip())
+    return None
+
+def fetch_page(url: str, client: Optional[HttpClient] = None) -> bytes:
+    response = (client or default_client()).get(url)
+    if response is None or response.status != 200:
+        raise RuntimeError(f'Failed to fetch {url}' + (f' (HTTP {response.status})' if response else ''))
+    return response.body
+
+def get_last_page(url: str, backend: str = 'html.parser', client: Optional[HttpClient] = None) -> Optional[int]:
+    response = (client or default_client()).get(url)
+    if response is None or response.status != 200:
+        return None
+    return parse_last_page(response.body, backend)
+
+def parse_results_page(content: bytes, backend: str = 'html.parser') -> list[str]:
+    soup = make_soup(content, backend)
+
+    # Finding URLs for all matches
+    cards = soup.find_all('div', class_='wf-card')
+    match_urls = []
+
+    for card in cards:
+        matches = card.find_all('a', class_=['wf-module-item', 'match-item'])
+        
+        for match in matches:
+            match_urls.append('https://www.vlr.gg' + match['href'])
+
+    return match_urls
+
+def req(url: str, backend: str = 'html.parser', client: Optional[HttpClient] = None) -> list[str]:
+    return parse_results_page(fetch_page(url, client), backend)
+
+def crawl_new_urls(known_urls: set[str], overlap: int, backend: str = 'html.parser') -> list[str]:
+    """
+    Walks the results pages from the newest one and returns the URLs of matches that aren't known yet.
+    Results are ordered newest first, so it stops after `overlap` consecutive pages that only contain known matches.
+    More than one page of overlap covers matches that shift to the next page while the crawl runs.
+    """
+    new_urls = []
+    known_pages = 0
+    page = 1
+    last_page = None
+
+    from tqdm import tqdm
+
+    with tqdm(desc='Scraping pages') as progress:
+        while last_page is None or page <= last_page:
+            content = fetch_page(RESULTS_URL.format(page=page))
+            if last_page is None:
+                last_page = parse_last_page(content, backend) or 1
+            page_urls = parse_results_page(content, backend)
+            progress.update()
+
+            page_new_urls = [url for url in page_urls if url not in known_urls]
+            new_urls += page_new_urls
+            known_urls.update(page_new_urls)
+            if page_new_urls:
+                known_pages = 0
+            else:
+                known_pages += 1
+                if known_pages >= overlap:
+                    break
+
+            page += 1
+            time.sleep(0.5)
+
+    return new_urls
+
+def load_completed_pages(path: str) -> dict[int, list[str]]:
+    """
+    Reads the pages finished by previous runs from the append-only progress file.
+    A line cut off by a crash is ignored, so that page is fetched again.
+    """
+    completed = {}
+    if not os.path.exists(path):
+        return completed
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            completed[record['page']] = record['urls']
+    return completed
+
+def crawl_all_pages(last_page: int, progress_path: str, backend: str, workers: int, rate: float, burst: int) -> Optional[list[str]]:
+    """
+    Fetches every results page up to last_page in parallel and appends each page's match URLs to the progress file
+    as soon as it's parsed. Pages already in the progress file are skipped, so an interrupted crawl resumes where it stopped.
+    Returns the de-duplicated URLs in page order, or None if some pages failed and the crawl has to be run again.
+    """
+    from tqdm import tqdm
+    from .fetcher import fetch_all
+
+    completed = load_completed_pages(progress_path)
+    missing_pages = [page for page in range(1, last_page + 1) if page not in completed]
+    if completed:
+        print(f'Resuming: {len(completed)} pages already done, {len(missing_pages)} to go')
+
+    page_urls = {RESULTS_URL.format(page=page): page for page in missing_pages}
+    failed = 0
+    with open(progress_path, 'a') as progress_file:
+        pages = fetch_all(page_urls, default_client(), workers=workers, rate=rate, burst=burst)
+        for url, status, content in tqdm(pages, total=len(page_urls), desc='Scraping pages'):
+            if content is None:
+                failed += 1
+                continue
+            page = page_urls[url]
+            completed[page] = parse_results_page(content, backend)
+            progress_file.write(json.dumps({'page': page, 'urls': completed[page]}) + '\n')
+            progress_file.flush()
+
+    if failed:
+        print(f'Error: {failed} pages failed, run the script again to retry them.')
+        return None
+
+    # Matches can move to the next page while the crawl runs, so the same URL may be on two pages
+    match_urls = []
+    seen = set()
+    for page in sorted(completed):
+        for url in completed[page]:
+            if url not in seen:
+                seen.add(url)
+                match_urls.append(url)
+    return match_urls
+
+def main():
+    parser = argparse.ArgumentParser(description='Scrape the URLs of all matches on the vlr.gg results pages into ./data/match_urls.json')
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default='html.parser', help='HTML parser backend (default: html.parser)')
+    parser.add_argument('--incremental', action='store_true', help='Only crawl pages until the already known matches are reached, and merge the new URLs in')
+    parser.add_argument('--overlap', type=int, default=2, help='With --incremental, number of consecutive pages of known matches before stopping (default: 2)')
+    parser.add_argument('--workers', type=int, default=1, help='Number of concurrent requests for the full crawl (default: 1)')
+    parser.add_argument('--rate', type=float, default=2.0, help='Maximum requests per second (default: 2.0)')
+    parser.add_argument('--burst', type=int, default=1, help='Number of requests allowed in a burst above the rate (default: 1)')
+    parser.add_argument('--stats-file', default='./data/crawl_stats.jsonl', help='Append a JSON line with the request metrics of the full crawl here (default: ./data/crawl_stats.jsonl)')
+    parser.add_argument('--prometheus-file', default=None, help='Write the request metrics of the full crawl to this file in the Prometheus text format')
+    args = parser.parse_args()
+
+    if args.incremental and os.path.exists('./data/match_urls.json'):
+        with open('./data/match_urls.json', 'r') as f:
+            known_urls = json.load(f)
+
+        new_urls = crawl_new_urls(set(known_urls), max(1, args.overlap), args.parser)
+        print(f'Found {len(new_urls)} new matches')
+
+        # New matches go first, to keep the file ordered newest first like the results pages
+        with open('./data/match_urls.json', 'w') as f:
+            json.dump(new_urls + known_urls, f)
+        return
+
+    last_page = get_last_page(RESULTS_URL.format(page=1), args.parser)
+
+    if not last_page:
+        print('Error: Could not find last page. Try hardcoding it into the loop in stead.')
+        return
+
+    progress_path = './data/match_urls.partial'
+    start = time.monotonic()
+    match_urls = crawl_all_pages(last_page, progress_path, args.parser, args.workers, args.rate, args.burst)
+    if args.stats_file:
+        metrics.write_json_line(args.stats_file, elapsed=round(time.monotonic() - start, 3))
+    if args.prometheus_file:
+        metrics.write_prometheus(args.prometheus_file)
+    if match_urls is None:
+        return
+
+    with open('./data/match_urls.json', 'w') as f:
+        json.dump(match_urls, f)
+    os.remove(progress_path)
+
+if __name__ == '__main__':
+    main()
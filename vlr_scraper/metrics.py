@@ -0,0 +1,197 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Optional
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PARSE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+PROMETHEUS_PREFIX = 'vlr_scraper_'
+
+class Histogram:
+    """
+    Fixed-bucket histogram, like a Prometheus one: counts per bucket plus the sum and count of the observed values.
+    """
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimates a quantile by interpolating inside its bucket, values over the last bucket are reported as its bound.
+        """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count > 0:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+def _key(name: str, labels: dict) -> str:
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{label}="{value}"' for label, value in sorted(labels.items())) + '}'
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _with_label(key: str, label: str) -> str:
+    # Adds the le label of a histogram bucket to a series key
+    if key.endswith('}'):
+        return key[:-1] + ',' + label + '}'
+    return key + '{' + label + '}'
+
+class Metrics:
+    """
+    Counters, gauges and histograms keyed by name and labels, shared by the fetcher threads and the pipeline.
+    Exported as a JSON stats line (with p50/p90/p99 estimates for the histograms) and in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.names = {}
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = _key(name, labels)
+        with self.lock:
+            self.names[key] = (name, 'counter')
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, kind: str = 'gauge', **labels) -> None:
+        """
+        Sets a value measured elsewhere, e.g. a queue size, or a counter kept by another process.
+        """
+        key = _key(name, labels)
+        with self.lock:
+            self.names[key] = (name, kind)
+            self.counters[key] = value
+
+    def observe(self, name: str, value: float, buckets: tuple[float, ...] = LATENCY_BUCKETS, **labels) -> None:
+        key = _key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+                self.names[key] = (name, 'histogram')
+            histogram.observe(value)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                'values': dict(self.counters),
+                'histograms': {
+                    key: {
+                        'count': h.count,
+                        'sum': round(h.sum, 6),
+                        'p50': h.quantile(0.5),
+                        'p90': h.quantile(0.9),
+                        'p99': h.quantile(0.99)
+                    } for key, h in self.histograms.items()
+                }
+            }
+
+    def prometheus(self) -> str:
+        lines = []
+        typed = set()
+        with self.lock:
+            # Sorted by metric name first, the series of a metric have to be next to each other
+            for key in sorted(self.names, key=lambda key: (self.names[key][0], key)):
+                name, kind = self.names[key]
+                if name not in typed:
+                    lines.append(f'# TYPE {PROMETHEUS_PREFIX}{name} {kind}')
+                    typed.add(name)
+                series = PROMETHEUS_PREFIX + key
+                if kind != 'histogram':
+                    lines.append(f'{series} {_number(self.counters[key])}')
+                    continue
+                h = self.histograms[key]
+                base = PROMETHEUS_PREFIX + name
+                labels = key[len(name):]
+                cumulative = 0
+                for bound, count in zip([f'{bound:g}' for bound in h.buckets] + ['+Inf'], h.counts):
+                    cumulative += count
+                    lines.append(f'{_with_label(base + "_bucket" + labels, "le=" + json.dumps(bound))} {cumulative}')
+                lines.append(f'{base}_sum{labels} {_number(h.sum)}')
+                lines.append(f'{base}_count{labels} {h.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_json_line(self, path: str, **extra) -> None:
+        """
+        Appends the current stats as one JSON line, with `extra` fields such as the elapsed time.
+        """
+        with open(path, 'a') as f:
+            f.write(json.dumps({'time': time.strftime('%Y-%m-%dT%H:%M:%S'), **extra, **self.snapshot()}) + '\n')
+
+    def write_prometheus(self, path: str) -> None:
+        """
+        Rewrites the Prometheus text file atomically, so the node exporter's textfile collector never reads half a file.
+        """
+        with open(path + '.tmp', 'w') as f:
+            f.write(self.prometheus())
+        os.replace(path + '.tmp', path)
+
+# Registry of the current process, the fetcher and the pipeline record into it
+metrics = Metrics()
+
+# Parse time per section of the current page, kept by each parser process and collected after every page
+_section_times = {}
+_section_stack = []
+
+@contextmanager
+def section(name: str):
+    """
+    Measures the CPU time of a section of the parser. Nested sections are subtracted from the enclosing one,
+    so the times add up to the total.
+    """
+    start = time.process_time()
+    _section_stack.append(0.0)
+    try:
+        yield
+    finally:
+        elapsed = time.process_time() - start
+        nested = _section_stack.pop()
+        _section_times[name] = _section_times.get(name, 0.0) + elapsed - nested
+        if _section_stack:
+            _section_stack[-1] += elapsed
+
+def timed(name: str) -> Callable:
+    """
+    Decorator version of section().
+    """
+    def decorator(function: Callable) -> Callable:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with section(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def take_section_times() -> dict[str, float]:
+    """
+    Returns the section times recorded since the last call and starts over.
+    """
+    times = dict(_section_times)
+    _section_times.clear()
+    _section_stack.clear()
+    return times
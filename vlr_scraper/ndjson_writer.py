@@ -0,0 +1,98 @@
+import json
+import os
+import time
+from typing import Optional
+
+class NdjsonWriter:
+    """
+    Appends match records to the NDJSON data file and their URLs to the scraped URLs log, keeping both files open.
+    Records are committed every `flush_every` records or `flush_interval` seconds, whichever comes first:
+    the data file is flushed and fsync'd, and only then are the URLs of the committed records appended to the log.
+    The data file is the source of truth (every record has its URL), so recover_ndjson can always bring the log back in line.
+    """
+
+    def __init__(self, data_path: str, log_path: str, flush_every: int = 100, flush_interval: float = 5.0):
+        self.data_file = open(data_path, 'a')
+        self.log_file = open(log_path, 'a')
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.pending_urls = []
+        self.committed = 0
+        self.last_commit = time.monotonic()
+
+    def write(self, record: dict) -> None:
+        self.data_file.write(json.dumps(record) + '\n')
+        self.pending_urls.append(record['url'])
+        if len(self.pending_urls) >= self.flush_every or self.seconds_until_commit() <= 0:
+            self.commit()
+
+    def seconds_until_commit(self) -> float:
+        return self.last_commit + self.flush_interval - time.monotonic()
+
+    def commit(self) -> None:
+        self.last_commit = time.monotonic()
+        if not self.pending_urls:
+            return
+
+        self.data_file.flush()
+        os.fsync(self.data_file.fileno())
+
+        self.log_file.write(''.join(url + '\n' for url in self.pending_urls))
+        self.log_file.flush()
+        os.fsync(self.log_file.fileno())
+
+        self.committed += len(self.pending_urls)
+        self.pending_urls = []
+
+    def close(self) -> None:
+        self.commit()
+        self.data_file.close()
+        self.log_file.close()
+
+def _truncate_partial_line(path: str) -> int:
+    """
+    Cuts off a last line that was only partly written when the process stopped, returns the number of complete lines.
+    """
+    lines = 0
+    end = 0
+    with open(path, 'rb') as f:
+        offset = 0
+        while chunk := f.read(1 << 20):
+            count = chunk.count(b'\n')
+            if count:
+                lines += count
+                end = offset + chunk.rindex(b'\n') + 1
+            offset += len(chunk)
+    if end != offset:
+        with open(path, 'r+b') as f:
+            f.truncate(end)
+    return lines
+
+def recover_ndjson(data_path: str, log_path: str) -> Optional[int]:
+    """
+    Brings the data file and the URL log back to a consistent state after a crash, returns the number of records.
+    The log is a prefix of the URLs in the data file, since it's only written after the data is fsync'd:
+    a partly written last line is removed from both files, and the URLs of the records missing from the log are appended.
+    """
+    if not os.path.exists(data_path):
+        return None
+    if not os.path.exists(log_path):
+        open(log_path, 'a').close()
+
+    records = _truncate_partial_line(data_path)
+    logged = _truncate_partial_line(log_path)
+    if logged > records:
+        # Written by something else than NdjsonWriter, the data file wins
+        open(log_path, 'w').close()
+        logged = 0
+
+    if logged < records:
+        with open(data_path, 'r') as data_file, open(log_path, 'a') as log_file:
+            for i, line in enumerate(data_file):
+                if i >= logged:
+                    log_file.write(json.loads(line)['url'] + '\n')
+            log_file.flush()
+            os.fsync(log_file.fileno())
+        print(f'Recovered {records - logged} records missing from {log_path}')
+
+    return records
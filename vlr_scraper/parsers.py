@@ -0,0 +1,123 @@
+from functools import lru_cache
+from typing import Iterator, Optional, Union
+
+# Parser backends that can be chosen with --parser
+PARSER_BACKENDS = ['html.parser', 'lxml']
+
+ClassFilter = Optional[Union[str, list[str]]]
+
+@lru_cache(maxsize=None)
+def _compile_xpath(name: Optional[str], class_: Optional[Union[str, tuple[str, ...]]], first: bool):
+    """
+    Compiles the XPath equivalent of BeautifulSoup's find/find_all(name, class_=class_) once per query.
+    """
+    from lxml import etree
+
+    def class_test(value: str) -> str:
+        # A single class matches any of the tag's classes, a string with spaces must match the whole attribute
+        if ' ' in value:
+            return f"normalize-space(@class)='{' '.join(value.split())}'"
+        return f"contains(concat(' ', normalize-space(@class), ' '), ' {value} ')"
+
+    path = f'descendant::{name or "*"}'
+    if isinstance(class_, tuple):
+        path += '[' + ' or '.join(class_test(value) for value in class_) + ']'
+    elif class_ is not None:
+        path += f'[{class_test(class_)}]'
+    if first:
+        path = f'({path})[1]'
+    return etree.XPath(path)
+
+# Tags whose strings bs4's .text leaves out of their parents' text
+_NON_TEXT_TAGS = ('script', 'style', 'template')
+
+@lru_cache(maxsize=None)
+def _text_xpath():
+    """
+    The text nodes of an element, without the contents of scripts, styles and templates (comments aren't text nodes),
+    like bs4's .text. lxml's text_content() would include them.
+    """
+    from lxml import etree
+
+    return etree.XPath(
+        './/text()[not(' + ' or '.join(f'ancestor::{tag}' for tag in _NON_TEXT_TAGS) + ')]',
+        smart_strings=False
+    )
+
+class LxmlNode:
+    """
+    Wraps an lxml element in the subset of the BeautifulSoup Tag API used by the extraction functions,
+    so they run unchanged on top of the lxml tree.
+    """
+
+    __slots__ = ['element']
+
+    def __init__(self, element):
+        self.element = element
+
+    def __bool__(self) -> bool:
+        # Like a bs4 Tag, a node is truthy even if it has no children
+        return True
+
+    @property
+    def name(self) -> str:
+        return self.element.tag
+
+    @property
+    def text(self) -> str:
+        if self.element.tag in _NON_TEXT_TAGS:
+            # The text of the script or style itself, like a bs4 Script or Stylesheet tag
+            return self.element.text_content()
+        return ''.join(_text_xpath()(self.element))
+
+    @property
+    def children(self) -> Iterator['LxmlNode']:
+        for element in self.element.iterchildren():
+            if isinstance(element.tag, str):
+                yield LxmlNode(element)
+
+    @property
+    def descendants(self) -> Iterator['LxmlNode']:
+        for element in self.element.iterdescendants():
+            if isinstance(element.tag, str):
+                yield LxmlNode(element)
+
+    def get(self, attribute: str, default=None):
+        value = self.element.get(attribute)
+        if value is None:
+            return default
+        # bs4 splits the class attribute into a list
+        return value.split() if attribute == 'class' else value
+
+    def __getitem__(self, attribute: str):
+        value = self.get(attribute)
+        if value is None:
+            raise KeyError(attribute)
+        return value
+
+    def find(self, name: Optional[str] = None, class_: ClassFilter = None) -> Optional['LxmlNode']:
+        class_ = tuple(class_) if isinstance(class_, list) else class_
+        found = _compile_xpath(name, class_, True)(self.element)
+        return LxmlNode(found[0]) if found else None
+
+    def find_all(self, name: Optional[str] = None, class_: ClassFilter = None) -> list['LxmlNode']:
+        class_ = tuple(class_) if isinstance(class_, list) else class_
+        return [LxmlNode(element) for element in _compile_xpath(name, class_, False)(self.element)]
+
+def make_soup(content: Union[bytes, str], backend: str = 'html.parser'):
+    """
+    Parses a page with the chosen backend. The result supports the find/find_all/text/get subset of
+    the BeautifulSoup API, so the extraction code is the same for every backend.
+    """
+    # The parser libraries are imported on first use, so importing the package stays cheap
+    if backend == 'html.parser':
+        from bs4 import BeautifulSoup
+
+        return BeautifulSoup(content, 'html.parser')
+    if backend == 'lxml':
+        import lxml.html
+        if isinstance(content, bytes):
+            parser = lxml.html.HTMLParser(encoding='utf-8')
+            return LxmlNode(lxml.html.document_fromstring(content, parser=parser))
+        return LxmlNode(lxml.html.document_fromstring(content))
+    raise ValueError(f'Unknown parser backend: {backend}, expected one of {", ".join(PARSER_BACKENDS)}')
@@ -0,0 +1,197 @@
+import cProfile
+import multiprocessing
+import pstats
+import queue
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Callable, Iterable, Optional
+from .ndjson_writer import NdjsonWriter
+from .metrics import PARSE_BUCKETS, metrics, take_section_times
+
+class StageStats:
+    """
+    Counts items and bytes going through one pipeline stage, and the time spent working on them.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.bytes = 0
+        self.busy = 0.0
+
+    def add(self, n_bytes: int = 0, busy: float = 0.0) -> None:
+        self.items += 1
+        self.bytes += n_bytes
+        self.busy += busy
+
+    def summary(self, elapsed: float) -> str:
+        rate = self.items / elapsed if elapsed > 0 else 0.0
+        return f'{self.name}: {self.items} ({rate:.1f}/s)'
+
+def _timed_parse(parse: Callable[[bytes, str], dict], content: bytes, url: str, profile: bool = False) -> tuple[Optional[dict], float, dict[str, float], Optional[dict]]:
+    """
+    Runs in a parser worker process, returns the match dict, the CPU time it took, the time spent in each
+    timed section of the parser and, if `profile` is set, the cProfile stats of the call.
+    """
+    take_section_times()
+    profiler = None
+    if profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    start = time.process_time()
+    match_data = parse(content, url)
+    busy = time.process_time() - start
+    if profiler is None:
+        return match_data, busy, take_section_times(), None
+    profiler.disable()
+    profiler.create_stats()
+    return match_data, busy, take_section_times(), profiler.stats
+
+class _ProfilerStats:
+    # Lets pstats load the stats dict sent back by a worker
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+def _writer(records: multiprocessing.Queue, received: multiprocessing.Value, written: multiprocessing.Value, busy: multiprocessing.Value,
+            data_path: str, log_path: str, flush_every: int, flush_interval: float) -> None:
+    """
+    Writer process: streams match dicts into the NDJSON file and their URLs into the log with an NdjsonWriter.
+    Counts the records taken off the queue in `received`, the committed ones in `written` and the seconds spent writing
+    and syncing in `busy`. Stops when it receives None.
+    """
+    writer = NdjsonWriter(data_path, log_path, flush_every=flush_every, flush_interval=flush_interval)
+    while True:
+        try:
+            # Wake up in time to commit what's pending even when no records arrive
+            item = records.get(timeout=max(writer.seconds_until_commit(), 0.1))
+        except queue.Empty:
+            start = time.perf_counter()
+            writer.commit()
+            busy.value += time.perf_counter() - start
+            written.value = writer.committed
+            continue
+        if item is None:
+            break
+        received.value += 1
+        start = time.perf_counter()
+        writer.write(item)
+        busy.value += time.perf_counter() - start
+        written.value = writer.committed
+
+    writer.close()
+    written.value = writer.committed
+
+def run_pipeline(pages: Iterable[tuple[str, Optional[int], Optional[bytes]]], parse: Callable[[bytes, str], dict], data_path: str, log_path: str,
+                 parse_workers: Optional[int] = None, max_pending: Optional[int] = None, total: Optional[int] = None, report_interval: float = 30.0,
+                 flush_every: int = 100, flush_interval: float = 5.0, stats_path: Optional[str] = None, prometheus_path: Optional[str] = None,
+                 profile_every: Optional[int] = None, profile_path: Optional[str] = None) -> None:
+    """
+    Fetch -> parse -> write pipeline. Raw pages from `pages` are parsed by a pool of `parse_workers` processes and
+    the resulting match dicts are appended by a single writer process, which commits them every `flush_every` records
+    or `flush_interval` seconds.
+    At most `max_pending` pages wait for a parser and at most 100 records wait for the writer, so a slow stage
+    holds back the ones before it instead of growing memory. Per-stage throughput is reported every `report_interval` seconds,
+    and the metrics registry is appended to `stats_path` as a JSON line and written to `prometheus_path` in the Prometheus text format.
+    With `profile_every`, one in every that many pages is parsed under cProfile and the aggregated stats are dumped to `profile_path`.
+    """
+    from tqdm import tqdm
+
+    parse_workers = parse_workers or multiprocessing.cpu_count()
+    max_pending = max_pending or parse_workers * 2
+
+    records = multiprocessing.Queue(maxsize=100)
+    # Queue.qsize() isn't implemented on macOS, the depth of the write queue is counted instead: records put - records received
+    records_put = 0
+    received = multiprocessing.Value('i', 0)
+    written = multiprocessing.Value('i', 0)
+    write_busy = multiprocessing.Value('d', 0.0)
+    writer = multiprocessing.Process(
+        target=_writer, args=(records, received, written, write_busy, data_path, log_path, flush_every, flush_interval), name='writer'
+    )
+    writer.start()
+
+    fetch_stats = StageStats('fetch')
+    parse_stats = StageStats('parse')
+    profile_stats = pstats.Stats() if profile_every else None
+    profiled = 0
+    start = last_report = time.monotonic()
+
+    def report():
+        elapsed = time.monotonic() - start
+        parse_capacity = parse_stats.items / (parse_stats.busy / parse_workers) if parse_stats.busy > 0 else 0.0
+        write_rate = written.value / elapsed if elapsed > 0 else 0.0
+        write_queue = records_put - received.value
+        tqdm.write(
+            f'[{elapsed:.0f}s] {fetch_stats.summary(elapsed)}, {fetch_stats.bytes / 1e6:.1f} MB | '
+            f'{parse_stats.summary(elapsed)}, capacity {parse_capacity:.1f}/s, {len(in_flight)}/{max_pending} queued | '
+            f'write: {written.value} ({write_rate:.1f}/s), {write_queue}/100 queued'
+        )
+
+        metrics.set('parse_queue', len(in_flight))
+        metrics.set('write_queue', write_queue)
+        metrics.set('records_written_total', written.value, kind='counter')
+        metrics.set('write_seconds_total', write_busy.value, kind='counter')
+        if stats_path:
+            metrics.write_json_line(stats_path, elapsed=round(elapsed, 3))
+        if prometheus_path:
+            metrics.write_prometheus(prometheus_path)
+
+    def collect(done: set[Future]):
+        nonlocal profiled, records_put
+        for future in done:
+            url = in_flight.pop(future)
+            try:
+                match_data, busy, sections, profile = future.result()
+            except Exception as e:
+                print(f'Failed to parse {url}: {str(e)}')
+                metrics.inc('parse_errors_total', type=type(e).__name__)
+                continue
+            parse_stats.add(busy=busy)
+            metrics.inc('pages_parsed_total')
+            if profile is not None:
+                profile_stats.add(_ProfilerStats(profile))
+                profiled += 1
+            else:
+                # Profiled pages are left out of the timings, cProfile slows them down
+                metrics.observe('parse_seconds', busy, PARSE_BUCKETS)
+                for name, seconds in sections.items():
+                    metrics.observe('parse_section_seconds', seconds, PARSE_BUCKETS, section=name)
+            if match_data is not None:
+                records.put(match_data)
+                records_put += 1
+
+    in_flight = {}
+    try:
+        with ProcessPoolExecutor(max_workers=parse_workers) as executor:
+            for url, status, content in tqdm(pages, total=total, desc='Scraping matches'):
+                if content is None:
+                    continue
+                fetch_stats.add(n_bytes=len(content))
+
+                # Backpressure: wait for a parser to free up before taking more pages from the fetchers
+                if len(in_flight) >= max_pending:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                profile = bool(profile_every) and (fetch_stats.items - 1) % profile_every == 0
+                in_flight[executor.submit(_timed_parse, parse, content, url, profile)] = url
+
+                if time.monotonic() - last_report >= report_interval:
+                    report()
+                    last_report = time.monotonic()
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+    finally:
+        records.put(None)
+        writer.join()
+        report()
+
+    if profiled:
+        if profile_path:
+            profile_stats.dump_stats(profile_path)
+        print(f'Parser profile of {profiled} sampled pages' + (f', saved to {profile_path}' if profile_path else ''))
+        profile_stats.sort_stats('cumulative').print_stats(25)
@@ -0,0 +1,117 @@
+import datetime
+import hashlib
+import json
+import re
+from typing import Iterable, Iterator, Optional
+from .fetcher import fetch_responses
+from .html_cache import HtmlCache
+from .http_client import HttpClient
+from .match_index import MatchIndex, match_id
+from .parsers import make_soup
+
+# Records are written by json.dumps with the default separators: the match date comes before the games and the URL is the last key
+DATE_PATTERN = re.compile(rb'"date": "(\d{4}-\d{2}-\d{2})"')
+URL_PATTERN = re.compile(rb'"url": ("(?:[^"\\]|\\.)*")\}\s*$')
+
+def recent_matches(index: MatchIndex, days: float, today: Optional[datetime.date] = None) -> list[str]:
+    """
+    URLs of the matches played in the last `days` days, by the date in their current record.
+    The data file is scanned with regexes instead of being decoded, and records superseded by a later one are skipped.
+    """
+    since = ((today or datetime.date.today()) - datetime.timedelta(days=days)).isoformat().encode()
+    urls = []
+    with open(index.data_path, 'rb') as f:
+        offset = 0
+        for line in f:
+            start = offset
+            offset += len(line)
+            date = DATE_PATTERN.search(line)
+            if date is None or date.group(1) < since:
+                continue
+            found = URL_PATTERN.search(line)
+            if found is None:
+                continue
+            url = json.loads(found.group(1))
+            id_ = match_id(url)
+            if id_ is not None and index.offset(id_) == start:
+                urls.append(url)
+    return urls
+
+def stats_hash(content: bytes) -> Optional[str]:
+    """
+    SHA-256 of the whitespace-normalized text of the stats container, None if the page has none.
+    Ads, comments and view counts change all the time and are left out, so only stat corrections change the hash.
+    """
+    container = make_soup(content, 'lxml').find('div', class_='vm-stats-container')
+    if not container:
+        return None
+    return hashlib.sha256(' '.join(container.text.split()).encode('utf-8')).hexdigest()
+
+def conditional_headers(validators: dict) -> dict:
+    headers = {}
+    if validators['etag']:
+        headers['If-None-Match'] = validators['etag']
+    if validators['last_modified']:
+        headers['If-Modified-Since'] = validators['last_modified']
+    return headers
+
+def refresh_pages(urls: Iterable[str], client: HttpClient, cache: HtmlCache, workers: int = 1, rate: float = 2.0,
+                  burst: int = 1, updates: Optional[dict] = None) -> Iterator[tuple[str, int, bytes]]:
+    """
+    Re-fetches the URLs with conditional requests, using the ETag and Last-Modified stored in the cache,
+    and yields (url, 200, content) only for the pages whose stats changed. A 304 means the page didn't change,
+    otherwise the stats container's hash is compared with the one stored for the previous fetch (or computed from
+    the cached page). Unchanged pages are stored in the cache with their new validators and hash right away.
+    Changed pages are stored with the validators and hash of the record that's still in the data file, and their
+    new ones go to `updates` ({url: (etag, last_modified, stats hash)}) for save_refreshed to store once the new record
+    is committed: if it never is, the next refresh sees the change again instead of a matching hash or a 304.
+    """
+    urls = list(urls)
+    # Read up front, the SQLite connection can't be used from the fetcher's threads
+    headers = {url: conditional_headers(cache.validators(url)) for url in urls}
+
+    changed = not_modified = unchanged = failed = 0
+    for url, response in fetch_responses(urls, client, workers, rate, burst, headers=headers.get):
+        if response is not None and response.status == 304:
+            cache.touch(url)
+            not_modified += 1
+            continue
+        if response is None or response.status != 200:
+            failed += 1
+            continue
+
+        validators = cache.validators(url)
+        previous = validators['stats_hash']
+        if previous is None:
+            old_content = cache.get(url)
+            previous = stats_hash(old_content) if old_content is not None else None
+        new_hash = stats_hash(response.body)
+        etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+
+        if previous is not None and new_hash == previous:
+            cache.put(url, 200, response.body, etag, last_modified, new_hash)
+            unchanged += 1
+            continue
+        # An empty hash stands for a record whose stats hash isn't known, it never matches the hash of a page
+        cache.put(url, 200, response.body, validators['etag'], validators['last_modified'], previous or '')
+        if updates is not None:
+            updates[url] = (etag, last_modified, new_hash)
+        changed += 1
+        yield url, 200, response.body
+
+    print(f'Refreshed {len(urls)} matches: {changed} changed, {unchanged} unchanged, {not_modified} not modified (304), {failed} failed')
+
+def save_refreshed(cache: HtmlCache, index: MatchIndex, updates: dict, offsets: dict[int, Optional[int]]) -> int:
+    """
+    Stores the new validators and stats hash of the refreshed pages whose record was committed to the data file,
+    i.e. whose match's offset in the index moved on from `offsets` ({match ID: offset before the refresh}).
+    Returns the number of pages updated.
+    """
+    index.refresh()
+    saved = 0
+    for url, (etag, last_modified, new_hash) in updates.items():
+        id_ = match_id(url)
+        if id_ is not None and index.offset(id_) != offsets.get(id_):
+            cache.set_validators(url, etag, last_modified, new_hash)
+            saved += 1
+    return saved
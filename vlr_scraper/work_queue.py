@@ -0,0 +1,155 @@
+import sqlite3
+import time
+from typing import Iterable, Optional
+from .match_index import match_id
+
+class WorkQueue:
+    """
+    Lease-based queue of match pages to scrape, in a SQLite file shared by every worker.
+    A worker claims a batch of jobs, which are leased to it for `lease_seconds`. It renews the lease while it works
+    and marks the jobs done once their records are on disk. Leases of workers that stopped renewing expire,
+    and the jobs go back to the queue for another worker. Each claim counts as an attempt, and jobs that failed
+    `max_attempts` times are set aside as failed.
+
+    The file uses SQLite's rollback journal and not WAL, so it can be shared by machines through a network filesystem
+    with working file locks. Workers on a single machine can share a local file.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 300.0, max_attempts: int = 5):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # Autocommit mode, transactions are started explicitly with BEGIN IMMEDIATE so claims never race
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                match_id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, lease_until)')
+
+    def _transaction(self):
+        self.db.execute('BEGIN IMMEDIATE')
+
+    def add(self, urls: Iterable[str]) -> int:
+        """
+        Queues the match URLs, by match ID. Matches that are already queued (in any state) are skipped.
+        Returns the number of new jobs.
+        """
+        now = time.time()
+        rows = [(id_, url, now) for url in urls if (id_ := match_id(url)) is not None]
+        self._transaction()
+        try:
+            before = self.db.total_changes
+            self.db.executemany('INSERT OR IGNORE INTO jobs (match_id, url, updated_at) VALUES (?, ?, ?)', rows)
+            added = self.db.total_changes - before
+            self.db.execute('COMMIT')
+        except BaseException:
+            self.db.execute('ROLLBACK')
+            raise
+        return added
+
+    def _expire_leases(self, now: float) -> None:
+        # Jobs of workers that stopped renewing go back to the queue, or are set aside once they used all their attempts
+        self.db.execute(
+            "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, worker = NULL, lease_until = NULL, updated_at = ? "
+            "WHERE state = 'leased' AND lease_until < ?",
+            (self.max_attempts, now, now)
+        )
+
+    def claim(self, worker: str, batch_size: int) -> list[tuple[int, str]]:
+        """
+        Leases up to `batch_size` pending jobs to the worker, lowest match IDs first. Returns [(match ID, url)].
+        """
+        now = time.time()
+        self._transaction()
+        try:
+            self._expire_leases(now)
+            jobs = self.db.execute(
+                "SELECT match_id, url FROM jobs WHERE state = 'pending' ORDER BY match_id LIMIT ?", (batch_size,)
+            ).fetchall()
+            self.db.executemany(
+                "UPDATE jobs SET state = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1, updated_at = ? WHERE match_id = ?",
+                [(worker, now + self.lease_seconds, now, id_) for id_, _ in jobs]
+            )
+            self.db.execute('COMMIT')
+        except BaseException:
+            self.db.execute('ROLLBACK')
+            raise
+        return jobs
+
+    def _update_leased(self, sql: str, worker: str, ids: list[int], *params) -> int:
+        """
+        Runs the UPDATE on the jobs that are still leased to the worker, returns how many were updated.
+        """
+        if not ids:
+            return 0
+        self._transaction()
+        try:
+            before = self.db.total_changes
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                self.db.execute(
+                    f"{sql} WHERE state = 'leased' AND worker = ? AND match_id IN ({','.join('?' * len(chunk))})",
+                    (*params, worker, *chunk)
+                )
+            updated = self.db.total_changes - before
+            self.db.execute('COMMIT')
+        except BaseException:
+            self.db.execute('ROLLBACK')
+            raise
+        return updated
+
+    def renew(self, worker: str, ids: list[int]) -> int:
+        """
+        Extends the worker's leases on the jobs. Returns how many are still leased to it.
+        """
+        now = time.time()
+        return self._update_leased('UPDATE jobs SET lease_until = ?, updated_at = ?', worker, ids, now + self.lease_seconds, now)
+
+    def complete(self, worker: str, ids: list[int]) -> int:
+        """
+        Marks the jobs done. Jobs whose lease expired and went to another worker are left alone,
+        the merge step takes care of matches that were scraped twice.
+        """
+        return self._update_leased("UPDATE jobs SET state = 'done', lease_until = NULL, updated_at = ?", worker, ids, time.time())
+
+    def release(self, worker: str, ids: list[int]) -> int:
+        """
+        Gives up the worker's leases on jobs that failed, they're retried until they have used `max_attempts`.
+        """
+        return self._update_leased(
+            "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, worker = NULL, lease_until = NULL, updated_at = ?",
+            worker, ids, self.max_attempts, time.time()
+        )
+
+    def retry_failed(self) -> int:
+        """
+        Puts the failed jobs back in the queue with their attempts reset.
+        """
+        cursor = self.db.execute("UPDATE jobs SET state = 'pending', attempts = 0, updated_at = ? WHERE state = 'failed'", (time.time(),))
+        return cursor.rowcount
+
+    def counts(self) -> dict[str, int]:
+        counts = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0}
+        counts.update(self.db.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state').fetchall())
+        return counts
+
+    def workers(self) -> list[tuple[str, int, Optional[float]]]:
+        """
+        (worker, leased jobs, seconds until its leases expire) for every worker holding leases.
+        """
+        now = time.time()
+        rows = self.db.execute(
+            "SELECT worker, COUNT(*), MIN(lease_until) FROM jobs WHERE state = 'leased' GROUP BY worker ORDER BY worker"
+        ).fetchall()
+        return [(worker, count, lease_until - now if lease_until is not None else None) for worker, count, lease_until in rows]
+
+    def close(self) -> None:
+        self.db.close()